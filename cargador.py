@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+import pandas as pd  # type: ignore
+
+# === CACHÉ COLUMNAR (PARQUET) PARA LOS ARCHIVOS EXCEL ===
+# El primer read_excel de cada libro se guarda como <nombre>.parquet junto al
+# archivo original. La firma del origen (mtime, tamaño y muestra del contenido)
+# viaja en los metadatos del parquet: si el Excel cambia, la caché se descarta.
+# Cada vista declara sus columnas: el Excel se lee con usecols y el parquet
+# con selección de columnas. Si una vista pide columnas que la caché no
+# tiene, se relee el Excel con la unión de ambas y la caché crece.
+
+CLAVE_FIRMA = b"danu_origen"
+CLAVE_LEIDAS = b"danu_columnas_leidas"
+
+# === DATASETS COMPARTIDOS ENTRE SESIONES ===
+# Los cargadores usan st.cache_resource: un solo DataFrame por proceso que todas
+# las sesiones comparten sin copiarlo. Con copy-on-write, cualquier objeto que
+# derive de él (proyecciones, filtros, copias superficiales) se copia solo al
+# modificarse, así que ninguna vista puede alterar el dataset compartido.
+# Copy-on-write es una opción global de pandas: la activa el punto de entrada
+# de la aplicación (Page1.py) con activar_copy_on_write(), no este módulo.
+
+def activar_copy_on_write():
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+def ruta_cache(archivo):
+    return Path(archivo).with_suffix(".parquet")
+
+# === HUELLA DEL DATASET ===
+# mtime + tamaño + hash de bloques muestreados (inicio, fin y 14 puntos
+# intermedios). Se calcula una sola vez por versión del archivo y es la clave
+# de todas las cachés: parquet, arrow, índices, cubos, modelos y gráficas.
+# Así ninguna caché necesita hashear un DataFrame completo, y editar el Excel
+# en el mismo lugar invalida todo lo que dependía de él.
+
+BLOQUE_MUESTRA = 64 * 1024
+PUNTOS_MUESTRA = 16
+_muestras = {}
+
+def _hash_muestreado(archivo, tamano):
+    resumen = hashlib.sha1()
+    with open(archivo, "rb") as f:
+        if tamano <= BLOQUE_MUESTRA * PUNTOS_MUESTRA:
+            resumen.update(f.read())
+        else:
+            paso = (tamano - BLOQUE_MUESTRA) // (PUNTOS_MUESTRA - 1)
+            for i in range(PUNTOS_MUESTRA):
+                f.seek(i * paso)
+                resumen.update(f.read(BLOQUE_MUESTRA))
+    return resumen.hexdigest()
+
+def firma_origen(archivo):
+    archivo = Path(archivo)
+    stat = archivo.stat()
+    clave = (str(archivo.resolve()), stat.st_mtime_ns, stat.st_size)
+    if clave not in _muestras:
+        _muestras[clave] = _hash_muestreado(archivo, stat.st_size)
+    return {"mtime_ns": stat.st_mtime_ns, "tamano": stat.st_size, "muestra": _muestras[clave]}
+
+def huella_archivo(archivo):
+    # Identificador corto del contenido del archivo fuente para las cachés
+    return hashlib.sha1(json.dumps(firma_origen(archivo)).encode()).hexdigest()[:16]
+
+def _leer_cache(archivo, firma, columnas=None):
+    # Devuelve (df, columnas_leidas); df es None si la caché no sirve.
+    # columnas_leidas es None cuando la caché tiene el libro completo
+    import pyarrow.parquet as pq  # type: ignore
+
+    cache = ruta_cache(archivo)
+    if not cache.exists():
+        return None, []
+
+    esquema = pq.read_schema(cache)
+    metadatos = esquema.metadata or {}
+    if metadatos.get(CLAVE_FIRMA) != json.dumps(firma).encode():
+        return None, []
+
+    # Se guardan las columnas pedidas (no solo las encontradas) para no releer
+    # el Excel por una columna que el libro simplemente no tiene
+    leidas = json.loads(metadatos.get(CLAVE_LEIDAS, b"null"))
+    if columnas is None:
+        return (pq.read_table(cache).to_pandas() if leidas is None else None), leidas
+
+    if leidas is not None and not set(columnas) <= set(leidas):
+        return None, leidas
+
+    seleccion = [columna for columna in esquema.names if columna in set(columnas)]
+    return pq.read_table(cache, columns=seleccion).to_pandas(), leidas
+
+def _preparar_para_arrow(df):
+    # Excel mezcla números y textos en una misma columna (p. ej. "1,5" y 2.0);
+    # Arrow exige un tipo por columna, así que esas columnas se guardan como texto
+    df = df.copy()
+    for columna in df.select_dtypes(include="object").columns:
+        if pd.api.types.infer_dtype(df[columna], skipna=True).startswith("mixed"):
+            df[columna] = df[columna].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+def _escribir_cache(archivo, df, firma, leidas):
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    metadatos = dict(tabla.schema.metadata or {})
+    metadatos[CLAVE_FIRMA] = json.dumps(firma).encode()
+    metadatos[CLAVE_LEIDAS] = json.dumps(leidas).encode()
+    tabla = tabla.replace_schema_metadata(metadatos)
+
+    # Escritura atómica: otro proceso nunca ve un parquet a medio escribir
+    cache = ruta_cache(archivo)
+    temporal = cache.with_name(f".{cache.name}.{os.getpid()}.tmp")
+    pq.write_table(tabla, temporal)
+    os.replace(temporal, cache)
+
+def leer_excel(archivo, columnas=None):
+    archivo = Path(archivo)
+    firma = firma_origen(archivo)
+
+    leidas = []
+    try:
+        df, leidas = _leer_cache(archivo, firma, columnas)
+        if df is not None:
+            return df
+    except Exception:
+        pass  # Caché ilegible o pyarrow no disponible: se vuelve al Excel
+
+    # Se normaliza también en la lectura en frío para que la primera carga y
+    # las siguientes (desde parquet) devuelvan exactamente los mismos tipos
+    if columnas is None or leidas is None:
+        necesarias = None
+        df = _preparar_para_arrow(pd.read_excel(archivo))
+    else:
+        necesarias = sorted(set(columnas) | set(leidas))
+        df = _preparar_para_arrow(pd.read_excel(archivo, usecols=lambda columna: columna in necesarias))
+
+    try:
+        _escribir_cache(archivo, df, firma, necesarias)
+    except Exception:
+        pass  # Sin caché en disco la app sigue funcionando, solo más lenta
+
+    if columnas is None:
+        return df
+    return df[[columna for columna in df.columns if columna in set(columnas)]]
+
+# === TIPADO ÚNICO AL CARGAR ===
+# Las vistas ya no convierten tipos en cada rerun: los cargadores dejan las
+# columnas numéricas como float y la clase de entrega precalculada.
+
+ETIQUETAS_ENTREGA = ["Prime", "Express", "Regular"]
+LIMITES_ENTREGA = [-1, 3, 7, 30]
+
+def columna_numerica(serie):
+    # Acepta decimales con coma ("1,5") además de números reales
+    if serie.dtype == object:
+        serie = serie.astype(str).str.replace(',', '.', regex=False)
+    return pd.to_numeric(serie, errors='coerce')
+
+def clasificar_entrega(dias):
+    return pd.cut(dias, bins=LIMITES_ENTREGA, labels=ETIQUETAS_ENTREGA)
+
+def tipar_columnas(df, columnas_numericas, columna_dias='tiempo_total_entrega_dias'):
+    for columna in columnas_numericas:
+        if columna in df.columns:
+            df[columna] = columna_numerica(df[columna])
+
+    if columna_dias in df.columns:
+        df['tipo_entrega'] = clasificar_entrega(df[columna_dias])
+
+    return df
+
+def proyectar(df, columnas=None):
+    # Vista barata para una gráfica o función: nuevo objeto, mismos datos
+    if columnas is None:
+        return df.copy(deep=False)
+    return df[[columna for columna in columnas if columna in df.columns]]
+
+# === MODO COMPARTIDO ENTRE PROCESOS (ARROW IPC + MEMORY MAP) ===
+# Con DANU_DATASET_COMPARTIDO=1, el primer worker escribe el dataset ya
+# normalizado como <nombre>.arrow (Arrow IPC sin comprimir) y todos los workers
+# lo abren con memory-map de solo lectura: las columnas numéricas sin nulos se
+# leen directo de la caché de páginas del sistema, compartida entre procesos,
+# y un worker nuevo arranca sin parsear Excel. Subir VERSION_ARROW cuando
+# cambie la normalización de algún cargador.
+
+VERSION_ARROW = 2
+ESPERA_CANDADO = 600
+
+def modo_compartido():
+    return os.environ.get("DANU_DATASET_COMPARTIDO", "0") == "1"
+
+def ruta_arrow(archivo):
+    return Path(archivo).with_suffix(".arrow")
+
+def _abrir_arrow(ruta, firma):
+    import pyarrow as pa  # type: ignore
+
+    if not ruta.exists():
+        return None
+
+    tabla = pa.ipc.open_file(pa.memory_map(str(ruta), "r")).read_all()
+    metadatos = tabla.schema.metadata or {}
+    if metadatos.get(CLAVE_FIRMA) != json.dumps(firma).encode():
+        return None
+    return tabla
+
+def _escribir_arrow(ruta, df, firma):
+    import pyarrow as pa  # type: ignore
+    import pyarrow.feather as feather  # type: ignore
+
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    metadatos = dict(tabla.schema.metadata or {})
+    metadatos[CLAVE_FIRMA] = json.dumps(firma).encode()
+    tabla = tabla.replace_schema_metadata(metadatos)
+
+    temporal = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+    feather.write_feather(tabla, temporal, compression="uncompressed")
+    os.replace(temporal, ruta)
+
+def _con_candado(ruta, funcion):
+    # Candado por archivo (O_EXCL) para que un solo worker parsee y escriba
+    candado = ruta.with_name(f".{ruta.name}.lock")
+    inicio = time.monotonic()
+    while True:
+        try:
+            descriptor = os.open(candado, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() - inicio > ESPERA_CANDADO:
+                # Candado huérfano de un worker que murió a media escritura
+                Path(candado).unlink(missing_ok=True)
+            time.sleep(0.5)
+    try:
+        return funcion()
+    finally:
+        os.close(descriptor)
+        Path(candado).unlink(missing_ok=True)
+
+def cargar_normalizado(archivo, normalizar, columnas=None):
+    archivo = Path(archivo)
+    if not modo_compartido():
+        return normalizar(leer_excel(archivo, columnas))
+
+    ruta = ruta_arrow(archivo)
+    firma = {
+        **firma_origen(archivo),
+        "normalizacion": f"{normalizar.__module__}.{normalizar.__qualname__}",
+        "columnas": sorted(columnas) if columnas is not None else None,
+        "version": VERSION_ARROW,
+    }
+
+    def generar():
+        # Otro worker pudo haberlo escrito mientras esperábamos el candado
+        tabla = _abrir_arrow(ruta, firma)
+        if tabla is None:
+            _escribir_arrow(ruta, normalizar(leer_excel(archivo, columnas)), firma)
+            tabla = _abrir_arrow(ruta, firma)
+        return tabla
+
+    tabla = _abrir_arrow(ruta, firma) or _con_candado(ruta, generar)
+    return tabla.to_pandas(split_blocks=True)
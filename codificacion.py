@@ -0,0 +1,68 @@
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from cargador import columna_numerica
+
+# === CODIFICADOR CATEGÓRICO AJUSTADO ===
+# Se ajusta una vez con los datos de entrenamiento y se guarda con el modelo.
+# Cada valor conocido de una columna categórica apunta a un índice fijo de la
+# matriz de entrada, con el mismo orden y nombres que pd.get_dummies(drop_first=True):
+# primero las columnas numéricas y luego un bloque por columna categórica sin
+# su primera categoría. Codificar un archivo es escribir unos sobre una matriz
+# ya reservada, sin get_dummies ni columnas agregadas una por una.
+
+def ajustar_codificador(df, categoricas):
+    numericas = [columna for columna in df.columns if columna not in categoricas]
+    columnas = list(numericas)
+    indices, primeras = {}, {}
+    for columna in categoricas:
+        # Mismo orden de categorías que get_dummies: las de la columna si es
+        # 'category', o los valores únicos ordenados si es texto
+        valores = [str(valor) for valor in pd.Categorical(df[columna]).categories]
+        if not valores:
+            continue
+        primeras[columna] = valores[0]
+        indices[columna] = {valor: len(columnas) + i for i, valor in enumerate(valores[1:])}
+        columnas += [f"{columna}_{valor}" for valor in valores[1:]]
+
+    return {"numericas": numericas, "indices": indices, "primeras": primeras, "columnas": columnas}
+
+def _texto(serie):
+    return serie.astype(str).where(serie.notna())
+
+def contar_desconocidas(codificador, df):
+    # {columna: value_counts de los valores que el codificador no vio al ajustarse}
+    conteo = {}
+    for columna, indices in codificador["indices"].items():
+        if columna not in df.columns:
+            continue
+        valores = _texto(df[columna])
+        conocidas = valores.isin(indices.keys()) | (valores == codificador["primeras"][columna])
+        nuevas = valores.notna() & ~conocidas
+        if nuevas.any():
+            conteo[columna] = valores[nuevas].value_counts()
+    return conteo
+
+def codificar(codificador, df, desconocidas="ignorar"):
+    # desconocidas="ignorar": la fila queda en ceros en ese bloque (igual que la
+    # categoría de referencia) y se informa cuántas hubo; "error": ValueError
+    conteo_desconocidas = contar_desconocidas(codificador, df)
+    if conteo_desconocidas and desconocidas == "error":
+        columna, conteo = next(iter(conteo_desconocidas.items()))
+        raise ValueError(f"Valores no vistos en '{columna}': {sorted(conteo.index)[:5]}")
+
+    # Orden por columnas (Fortran): cada bloque se escribe contiguo y el
+    # escalador suma en el mismo orden que con el DataFrame de get_dummies
+    X = np.zeros((len(df), len(codificador["columnas"])), dtype=np.float64, order="F")
+
+    for posicion, columna in enumerate(codificador["numericas"]):
+        if columna in df.columns:
+            X[:, posicion] = columna_numerica(df[columna]).to_numpy(dtype=np.float64, na_value=np.nan)
+
+    for columna, indices in codificador["indices"].items():
+        if columna not in df.columns:
+            continue
+        posiciones = _texto(df[columna]).map(indices).to_numpy(dtype=np.float64, na_value=np.nan)
+        filas = np.flatnonzero(~np.isnan(posiciones))
+        X[filas, posiciones[filas].astype(np.int64)] = 1.0
+
+    return X, conteo_desconocidas
@@ -0,0 +1,100 @@
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+# === CUBO ADITIVO DE KPIs ===
+# Se construye una vez por versión del dataset. Cada celda es una combinación
+# ocupada de las dimensiones (categoría × región × periodo × tipo de entrega)
+# y guarda conteos, sumas y el histograma de días de entrega (0 a 30). Los
+# KPIs se responden sumando celdas, así que su costo depende del número de
+# celdas y no del número de pedidos.
+
+DIAS_HISTOGRAMA = 31
+
+def construir_cubo(dimensiones, medidas, dias):
+    # dimensiones: {nombre: Serie}; medidas: {nombre: Serie numérica}; dias: Serie
+    n = len(dias)
+    valores, codigos_filas, tamanos = {}, [], []
+    for nombre, serie in dimensiones.items():
+        codigos, unicos = pd.factorize(serie, sort=True)
+        # Los nulos ocupan el último código para que 'Todos' los siga contando
+        codigos = np.where(codigos < 0, len(unicos), codigos)
+        valores[nombre] = {str(valor): i for i, valor in enumerate(unicos)}
+        codigos_filas.append(codigos)
+        tamanos.append(len(unicos) + 1)
+
+    celda_fila = np.ravel_multi_index(codigos_filas, tamanos) if codigos_filas else np.zeros(n, dtype=np.int64)
+    celdas, inversa = np.unique(celda_fila, return_inverse=True)
+    inversa = inversa.reshape(-1)
+    n_celdas = len(celdas)
+
+    cubo = {
+        "valores": valores,
+        "nulo": {nombre: tamano - 1 for nombre, tamano in zip(dimensiones, tamanos)},
+        "codigos": dict(zip(dimensiones, np.unravel_index(celdas, tamanos) if codigos_filas else [])),
+        "n": np.bincount(inversa, minlength=n_celdas),
+        "medidas": {},
+    }
+
+    for nombre, serie in medidas.items():
+        datos = serie.to_numpy(dtype=float, na_value=np.nan)
+        validos = ~np.isnan(datos)
+        cubo["medidas"][nombre] = (
+            np.bincount(inversa[validos], weights=datos[validos], minlength=n_celdas),
+            np.bincount(inversa[validos], minlength=n_celdas),
+        )
+
+    # Los días se redondean al entero más cercano (como el histograma de la
+    # vista de predicción); fuera de 0-30 no entran al histograma
+    dias = np.rint(dias.to_numpy(dtype=float, na_value=np.nan))
+    en_rango = (dias >= 0) & (dias < DIAS_HISTOGRAMA)
+    cubo["histograma"] = np.bincount(
+        inversa[en_rango] * DIAS_HISTOGRAMA + dias[en_rango].astype(np.int64),
+        minlength=n_celdas * DIAS_HISTOGRAMA
+    ).reshape(n_celdas, DIAS_HISTOGRAMA)
+
+    return cubo
+
+def _mascara(cubo, filtros):
+    mascara = np.ones(len(cubo["n"]), dtype=bool)
+    for nombre, valor in filtros.items():
+        if valor is None or valor == 'Todos':
+            continue
+        if nombre.endswith("_valida"):
+            # Mismo vocabulario que indices.filtro_tipo_entrega
+            dimension = nombre[:-len("_valida")]
+            mascara &= cubo["codigos"][dimension] != cubo["nulo"][dimension]
+        else:
+            codigo = cubo["valores"][nombre].get(str(valor), -1)
+            mascara &= cubo["codigos"][nombre] == codigo
+    return mascara
+
+def agregar(cubo, filtros, por=None):
+    # Devuelve un DataFrame con n, suma_<medida> y n_<medida>, una fila por
+    # valor de 'por' (o una sola fila si por es None)
+    mascara = _mascara(cubo, filtros)
+    if por is None:
+        grupos, etiquetas = np.zeros(mascara.sum(), dtype=np.int64), ['Todos']
+    else:
+        grupos = cubo["codigos"][por][mascara]
+        etiquetas = list(cubo["valores"][por]) + [None]
+
+    k = len(etiquetas)
+    resultado = {"n": np.bincount(grupos, weights=cubo["n"][mascara], minlength=k)}
+    for nombre, (suma, cuenta) in cubo["medidas"].items():
+        resultado[f"suma_{nombre}"] = np.bincount(grupos, weights=suma[mascara], minlength=k)
+        resultado[f"n_{nombre}"] = np.bincount(grupos, weights=cuenta[mascara], minlength=k)
+
+    return pd.DataFrame(resultado, index=etiquetas).astype({"n": np.int64})
+
+def histograma(cubo, filtros):
+    return cubo["histograma"][_mascara(cubo, filtros)].sum(axis=0)
+
+def mediana_histograma(conteos, desde=0):
+    # Misma regla que Series.median(): con cantidad par se promedian los centrales
+    total = int(conteos.sum())
+    if total == 0:
+        return None
+    acumulado = np.cumsum(conteos)
+    bajo = int(np.searchsorted(acumulado, (total - 1) // 2 + 1))
+    alto = int(np.searchsorted(acumulado, total // 2 + 1))
+    return desde + (bajo + alto) / 2
@@ -1,59 +1,148 @@
 import streamlit as st   # type: ignore
 import pandas as pd   # type: ignore
 from pathlib import Path
-from sklearn.preprocessing import StandardScaler   # type: ignore
-from imblearn.combine import SMOTEENN   # type: ignore
-from collections import Counter
-from sklearn.model_selection import train_test_split   # type: ignore
-from sklearn.neighbors import KNeighborsClassifier   # type: ignore
 from sklearn.metrics import confusion_matrix, classification_report   # type: ignore
 import matplotlib.pyplot as plt   # type: ignore
 import seaborn as sns   # type: ignore
 import numpy as np  # type: ignore
 import plotly.express as px # type: ignore
+from cargador import cargar_normalizado, huella_archivo
+from modelos import clave_modelo, cargar_modelo
+from puntuacion import (puntuar_archivo, conteos_por_categoria, huella_contenido, crear_cache_resultados,
+                        memo_modelo, buscar_resultado, guardar_resultado)
+from entrenamiento import (ETAPAS, ESTRATEGIAS_REMUESTREO, FILAS_MAX_REMUESTREO, ALGORITMOS_VECINOS,
+                           CONDENSACIONES, ESTIMADORES, crear_gestor, enviar_entrenamiento, estado_trabajo)
+from tablas import mostrar_tabla_paginada, fuente_archivo, fuente_dataframe
+from memoria import reducir_memoria, reporte_memoria
+from inicio import cargar_datos as cargar_datos_upd
+from prediccion import cargar_base_proyeccion
+
+ARCHIVO_MODELO = Path("UPDINTEGRADO_MODELO_FINAL.xlsx")
+
+# st.download_button no transmite por partes: al hacer clic el archivo completo
+# se lee a memoria y Streamlit guarda otra copia. Por encima de este tamaño la
+# descarga se desactiva para que la memoria del servidor siga acotada
+MAX_MB_DESCARGA = 200
+
+def normalizar_modelo(df):
+    # La base del modelo solo se compacta sin perder precisión: texto a
+    # 'category' y días a enteros, pero los flotantes siguen en float64
+    return reducir_memoria(df, flotantes=False)
+
+def huella_modelo():
+    return huella_archivo(ARCHIVO_MODELO) if ARCHIVO_MODELO.exists() else None
 
-@st.cache_data(show_spinner="Cargando base de datos...")
 def cargar_datos():
-    archivo = Path("UPDINTEGRADO_MODELO_FINAL.xlsx")
-    if not archivo.exists():
+    huella = huella_modelo()
+    if huella is None:
         return None, "Archivo UPDINTEGRADO_MODELO_FINAL.xlsx no encontrado."
+    return cargar_datos_version(huella)
+
+@st.cache_resource(show_spinner="Cargando base de datos...", max_entries=2)
+def cargar_datos_version(huella):
     try:
-        df = pd.read_excel(archivo)
+        df = cargar_normalizado(ARCHIVO_MODELO, normalizar_modelo)
         return df, None
     except Exception as e:
         return None, str(e)
 
-@st.cache_resource
-def pipeline_entrenar_knn(df_original, n_neighbors=5):
-    columnas_a_eliminar = ['precio', 'pago', 'costo_de_flete', 'numero_de_producto_id',
-                           'categoria_nombre_producto', 'tipo_de_pago', 'estado_del_pedido',
-                           'secuencia_corregida', 'frecuencia_de_compra_cliente']
-    df = df_original.drop(columns=columnas_a_eliminar)
-
-    columnas_categoricas = df.select_dtypes(include='object').columns.tolist()
-    df = pd.get_dummies(df, columns=columnas_categoricas, drop_first=True)
-    df = df.astype({col: 'int' for col in df.select_dtypes(include='bool').columns})
+# === MODELO COMPARTIDO ENTRE SESIONES ===
+# El entrenamiento corre en un proceso aparte (ver entrenamiento.py). Aquí solo
+# se consulta si el modelo ya existe: primero en memoria del servidor, luego
+# en el almacén en disco. Mientras tanto la vista sigue respondiendo.
 
-    X = df.drop(columns=["tipo_entrega_clase"], errors='ignore')
-    y = df["tipo_entrega_clase"]
-    columnas_X = X.columns.tolist()
+@st.cache_resource
+def gestor_entrenamiento():
+    return crear_gestor()
 
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+@st.cache_resource
+def modelos_instalados():
+    return {}
+
+def obtener_modelo(huella, **parametros):
+    clave = clave_modelo("knn", huella, **parametros)
+    instalados = modelos_instalados()
+    if clave not in instalados:
+        artefactos = cargar_modelo(clave)
+        if artefactos is None:
+            return None
+        instalados[clave] = artefactos
+    return instalados[clave]
+
+def mostrar_progreso_entrenamiento(df, huella, **parametros):
+    clave = clave_modelo("knn", huella, **parametros)
+    # El DataFrame solo viaja al proceso hijo cuando el trabajo es nuevo
+    try:
+        trabajo = enviar_entrenamiento(gestor_entrenamiento(), df, clave, **parametros)
+    except Exception as e:
+        st.error(f"No se pudo iniciar el entrenamiento: {e}")
+        return
 
-    smote_enn = SMOTEENN(random_state=42)
-    X_resampled, y_resampled = smote_enn.fit_resample(X_scaled, y)
+    # Un trabajo fallido no se reenvía solo ni se sigue consultando
+    estado = estado_trabajo(trabajo)
+    if estado["error"] is not None:
+        st.error(f"Error al entrenar el modelo: {estado['error']}")
+        if st.button("Reintentar entrenamiento", key=f"reintentar_{clave}"):
+            try:
+                enviar_entrenamiento(gestor_entrenamiento(), df, clave, reintentar=True, **parametros)
+            except Exception as e:
+                st.error(f"No se pudo reiniciar el entrenamiento: {e}")
+                return
+            st.rerun()
+        return
 
-    dist_df = pd.DataFrame.from_dict(Counter(y_resampled), orient='index', columns=['Cantidad'])
-    dist_df.index.name = 'Clase'
+    @st.fragment(run_every=1.0)
+    def progreso():
+        estado = estado_trabajo(gestor_entrenamiento()["trabajos"][clave])
+        if estado["terminado"] or estado["error"] is not None:
+            st.rerun()  # Se vuelve a dibujar la página completa: con el modelo o con el error
 
-    X_train, X_test, y_train, y_test = train_test_split(X_resampled, y_resampled, test_size=0.3, random_state=42)
+        st.progress(estado["avance"], text=f"Entrenando modelo · {estado['etapa']} ({estado['segundos']:.0f} s)")
+        st.caption(" → ".join(
+            f"**{etapa}**" if etapa == estado["etapa"] else etapa for etapa in ETAPAS
+        ))
 
-    knn = KNeighborsClassifier(n_neighbors=n_neighbors)
-    knn.fit(X_train, y_train)
-    y_pred = knn.predict(X_test)
+    progreso()
 
-    return knn, scaler, columnas_X, y_test, y_pred, dist_df, df  
+# Resultados de predicción compartidos por todas las sesiones (LRU por contenido)
+@st.cache_resource
+def cache_predicciones():
+    return crear_cache_resultados()
+
+def seleccionar_parametros_modelo():
+    parametros = {"n_neighbors": 5}
+    parametros["estrategia"] = st.selectbox(
+        "Estrategia de remuestreo",
+        list(ESTRATEGIAS_REMUESTREO),
+        format_func=ESTRATEGIAS_REMUESTREO.get,
+        key="estrategia_remuestreo",
+    )
+    # El tope de filas solo forma parte de la clave del modelo cuando se usa
+    if parametros["estrategia"] == "submuestreo":
+        parametros["filas_max"] = int(st.number_input(
+            "Máximo de filas antes de SMOTE", min_value=1_000, value=FILAS_MAX_REMUESTREO, step=5_000,
+            key="filas_max_remuestreo",
+        ))
+    parametros["algoritmo"] = st.selectbox(
+        "Backend de búsqueda de vecinos",
+        list(ALGORITMOS_VECINOS),
+        format_func=ALGORITMOS_VECINOS.get,
+        key="algoritmo_vecinos",
+    )
+    parametros["condensacion"] = st.selectbox(
+        "Condensación del modelo",
+        list(CONDENSACIONES),
+        format_func=CONDENSACIONES.get,
+        key="condensacion_modelo",
+    )
+    # Opcional: el benchmark ajusta un KNN más por backend. Solo entra en la
+    # clave del modelo cuando se activa
+    if st.checkbox("Comparar backends de vecinos al entrenar", key="comparar_backends"):
+        parametros["comparar_backends"] = True
+    return parametros
+
+def tabla_tiempos(tiempos):
+    return pd.DataFrame({"Etapa": list(tiempos), "Segundos": [round(t, 2) for t in tiempos.values()]})
 
 def vista_exploracion():
     st.title("Exploración del Modelo")
@@ -63,95 +152,198 @@ def vista_exploracion():
         st.error(error)
         return
 
-    # Inicializar variable de sesión
-    if 'df_predicho' not in st.session_state:
-        st.session_state.df_predicho = None
+    huella = huella_modelo()
 
     # MODELO KNN DENTRO DEL BOTÓN 
     with st.expander("Descubre Nuestros Resultados", expanded=False):
 
-        # Llamada al pipeline cacheado
-        knn, scaler, columnas_X, y_test, y_pred, dist_df, df_post = pipeline_entrenar_knn(df)
-
-        st.markdown("### Tipos de datos en el DataFrame post-procesamiento")
-        tipos_df = df_post.dtypes.reset_index()
-        tipos_df.columns = ['Columna', 'Tipo de Dato']
-        st.dataframe(tipos_df, use_container_width=True)
-
-        st.markdown("### Distribución SMOTE + ENN")
-        st.dataframe(dist_df, use_container_width=True)
-
-        # Matriz de Confusión
-        labels = [0, 1, 2]
-        target_names = ['Prime', 'Express', 'Regular']
-
-        cm = confusion_matrix(y_test, y_pred, labels=labels)
-        st.subheader("Matriz de Confusión")
-        fig, ax = plt.subplots()
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=target_names, yticklabels=target_names)
-        ax.set_xlabel('Predicted')
-        ax.set_ylabel('Actual')
-        st.pyplot(fig)
-
-        # Reporte de Clasificación
-        st.subheader("Reporte de Clasificación")
-        report_dict = classification_report(y_test, y_pred, target_names=target_names, output_dict=True)
-        report_df = pd.DataFrame(report_dict).transpose().round(2)
-        st.dataframe(report_df, use_container_width=True)
-
-        # Guardar en sesión
-        st.session_state.knn_model = knn
-        st.session_state.scaler = scaler
-        st.session_state.columnas_X = columnas_X
+        parametros = seleccionar_parametros_modelo()
+
+        # Modelo ya entrenado o, si no existe, entrenamiento en segundo plano
+        modelo = obtener_modelo(huella, **parametros)
+        if modelo is None:
+            mostrar_progreso_entrenamiento(df, huella, **parametros)
+        else:
+            y_test = modelo["y_test"]
+
+            st.markdown("### Tipos de datos en el DataFrame post-procesamiento")
+            tipos_df = modelo["tipos_post"].reset_index()
+            tipos_df.columns = ['Columna', 'Tipo de Dato']
+            mostrar_tabla_paginada("tabla_tipos", fuente_dataframe(tipos_df, clave_modelo('knn', huella, **parametros)))
+
+            st.markdown(f"### Distribución por etapa · {ESTRATEGIAS_REMUESTREO[modelo['estrategia']]}")
+            st.dataframe(modelo["distribucion"], use_container_width=True)
+
+            st.markdown("### Tiempos de entrenamiento")
+            col_etapas, col_remuestreo = st.columns(2)
+            with col_etapas:
+                st.dataframe(tabla_tiempos(modelo["tiempos"]), use_container_width=True, hide_index=True)
+            with col_remuestreo:
+                st.dataframe(tabla_tiempos(modelo["tiempos_remuestreo"]), use_container_width=True, hide_index=True)
+
+            # Ranking de estimadores con la misma partición y elección del modelo servido
+            st.subheader("Ranking de Modelos")
+            st.dataframe(modelo["ranking"], use_container_width=True, hide_index=True)
+            servido = st.selectbox(
+                "Modelo para predecir",
+                list(ESTIMADORES),
+                format_func=ESTIMADORES.get,
+                key="modelo_servido",
+            )
+            y_pred = modelo["predicciones_estimadores"][servido]
+
+            # Matriz de Confusión
+            labels = [0, 1, 2]
+            target_names = ['Prime', 'Express', 'Regular']
+
+            cm = confusion_matrix(y_test, y_pred, labels=labels)
+            st.subheader(f"Matriz de Confusión · {ESTIMADORES[servido]}")
+            fig, ax = plt.subplots()
+            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=target_names, yticklabels=target_names)
+            ax.set_xlabel('Predicted')
+            ax.set_ylabel('Actual')
+            st.pyplot(fig)
+
+            # Reporte de Clasificación
+            st.subheader(f"Reporte de Clasificación · {ESTIMADORES[servido]}")
+            report_dict = classification_report(y_test, y_pred, target_names=target_names, output_dict=True)
+            report_df = pd.DataFrame(report_dict).transpose().round(2)
+            st.dataframe(report_df, use_container_width=True)
+
+            # Modelo completo contra modelo condensado
+            if modelo["condensacion"] is not None:
+                st.subheader("Condensación del modelo")
+                st.caption("Tamaño serializado y latencia de predicción sobre el conjunto de prueba.")
+                st.dataframe(modelo["condensacion"], use_container_width=True, hide_index=True)
+
+            # Benchmark de backends con el tamaño y la dimensión reales del modelo
+            comparacion = modelo["comparacion"]
+            if comparacion is not None:
+                st.subheader("Comparación de backends de vecinos")
+                st.caption(
+                    f"{modelo['knn'].n_samples_fit_:,} filas de entrenamiento · {modelo['knn'].n_features_in_} columnas · "
+                    f"más rápido al predecir: **{comparacion['Backend'].iloc[0]}** · "
+                    f"el modelo servido usa: {ALGORITMOS_VECINOS[modelo['algoritmo']]}"
+                )
+                st.dataframe(comparacion, use_container_width=True, hide_index=True)
+
+            # Barrido de n_neighbors (sale de la misma búsqueda de vecinos)
+            st.subheader("Barrido de n_neighbors")
+            barrido = modelo["barrido"]
+            fig_barrido = px.line(
+                barrido.melt(id_vars="k", var_name="Métrica", value_name="Valor"),
+                x="k", y="Valor", color="Métrica", markers=True
+            )
+            fig_barrido.add_vline(x=modelo["knn"].n_neighbors, line_dash="dash", line_color="gray")
+            fig_barrido.update_layout(xaxis_title="n_neighbors", yaxis_title="", height=380)
+            st.plotly_chart(fig_barrido, use_container_width=True)
+            st.dataframe(barrido, use_container_width=True, hide_index=True)
+
+    # DIAGNÓSTICO DE MEMORIA DE LOS DATASETS CARGADOS
+    with st.expander("Uso de Memoria de los Datasets", expanded=False):
+        # El cuerpo del expander corre siempre: cada dataset se carga solo al elegirlo
+        datasets = {
+            "UPDINTEGRADO": lambda: cargar_datos_upd()[0],
+            "UPDINTEGRADO_MODELO_FINAL": lambda: df,
+            "DATASETFINALOK": lambda: cargar_base_proyeccion()[0],
+        }
+        nombre = st.selectbox(
+            "Dataset a inspeccionar", [None] + list(datasets),
+            format_func=lambda n: "Elige un dataset" if n is None else n, key="dataset_memoria",
+        )
+        if nombre is not None:
+            df_memoria = datasets[nombre]()
+            if df_memoria is None:
+                st.info(f"{nombre} no está disponible.")
+            else:
+                reporte = reporte_memoria(df_memoria)
+                st.markdown(f"**{nombre}**: {len(df_memoria):,} filas · {reporte['Memoria (MB)'].sum():.2f} MB")
+                st.dataframe(reporte, use_container_width=True)
 
     #  PREDICCIÓN POR ARCHIVO SUBIDO EN EXPANDER
     st.markdown("---")
     with st.expander("Prueba Nuestro Modelo", expanded=False):
 
         archivo_subido = st.file_uploader("Sube tu archivo con pedidos (volumen, region, categoria_de_productos)", type=["csv", "xlsx"])
-
-        if archivo_subido is not None:
-            try:
-                if archivo_subido.name.endswith(".csv"):
-                    df_input = pd.read_csv(archivo_subido)
+        formato = st.radio("Formato del archivo de resultados", ["csv", "parquet"], format_func=str.upper, horizontal=True)
+
+        modelo = obtener_modelo(huella, **parametros)
+        if archivo_subido is not None and modelo is None:
+            st.info("El modelo todavía se está entrenando; abre 'Descubre Nuestros Resultados' para ver el avance.")
+        elif archivo_subido is not None:
+            estimador = st.session_state.get("modelo_servido", "knn")
+            version = f"{clave_modelo('knn', huella, **parametros)}:{estimador}"
+
+            # El contenido se hashea una vez por archivo subido, no en cada rerun
+            if st.session_state.get("archivo_prediccion", (None,))[0] != archivo_subido.file_id:
+                st.session_state.archivo_prediccion = (archivo_subido.file_id, huella_contenido(archivo_subido))
+            clave = (st.session_state.archivo_prediccion[1], version, formato)
+            st.session_state.clave_prediccion = clave
+
+            cache = cache_predicciones()
+            resultado = buscar_resultado(cache, clave)
+            if resultado is not None:
+                st.caption("Resultado reutilizado: este archivo ya se había puntuado con el mismo modelo.")
+            else:
+                barra = st.progress(0.0, text="Prediciendo...")
+                try:
+                    resultado = puntuar_archivo(
+                        modelo, archivo_subido, archivo_subido.name, formato, estimador,
+                        reportar=lambda avance, filas: barra.progress(avance, text=f"Prediciendo... {filas:,} filas"),
+                        memo=memo_modelo(cache, version),
+                    )
+                    guardar_resultado(cache, clave, resultado)
+                except Exception as e:
+                    st.error(f"Error al procesar el archivo: {e}")
+                barra.empty()
+
+            if resultado is not None and resultado["filas"] == 0:
+                st.warning("El archivo no tiene filas para predecir.")
+            elif resultado is not None:
+                for columna, conteo in resultado["desconocidas"].items():
+                    st.warning(
+                        f"{int(conteo.sum())} filas con valores de '{columna}' que el modelo no vio al entrenar "
+                        f"({', '.join(map(str, conteo.index[:5]))}); se tratan como la categoría de referencia."
+                    )
+
+                st.success(
+                    f"Predicciones Generadas: {resultado['filas']:,} filas en {resultado['segundos']:.1f} s "
+                    f"({resultado['predichas']:,} combinaciones distintas pasaron por el modelo)"
+                )
+                # Solo la página visible viaja al navegador; el archivo completo, en la descarga
+                mostrar_tabla_paginada(
+                    "tabla_predicciones",
+                    fuente_archivo(resultado["ruta"], resultado["formato"], resultado["filas"], resultado["tipos"]),
+                )
+
+                ruta = resultado["ruta"]
+                megas = Path(ruta).stat().st_size / 1024 ** 2
+                if megas > MAX_MB_DESCARGA:
+                    st.warning(
+                        f"El resultado pesa {megas:,.0f} MB y la descarga desde la app admite hasta "
+                        f"{MAX_MB_DESCARGA} MB. Elige el formato Parquet (más compacto) o divide el archivo subido."
+                    )
                 else:
-                    df_input = pd.read_excel(archivo_subido)
-
-                columnas_esperadas = {'volumen', 'region', 'categoria_de_productos'}
-                if not columnas_esperadas.issubset(df_input.columns):
-                    st.error("El archivo debe contener las columnas: 'volumen', 'region' y 'categoria_de_productos'")
-                else:
-                    df_pred = df_input[['volumen', 'region', 'categoria_de_productos']].copy()
-                    df_pred.columns = ['volumen', 'region', 'categoria_nombre_producto']
-                    df_pred = pd.get_dummies(df_pred, drop_first=True)
-
-                    for col in st.session_state.columnas_X:
-                        if col not in df_pred.columns:
-                            df_pred[col] = 0
-                    df_pred = df_pred[st.session_state.columnas_X]
-
-                    X_pred_scaled = st.session_state.scaler.transform(df_pred)
-                    predicciones = st.session_state.knn_model.predict(X_pred_scaled)
-                    pred_label = {0: 'Prime', 1: 'Express', 2: 'Regular'}
-                    df_input['Predicción'] = [pred_label[p] for p in predicciones]
-
-                    st.success("Predicciones Generadas")
-                    st.dataframe(df_input, use_container_width=True)
-
-                    st.session_state.df_predicho = df_input
-
-            except Exception as e:
-                st.error(f"Error al procesar el archivo: {e}")
+                    # Diferida, no transmitida: el archivo se lee solo al hacer clic
+                    st.download_button(
+                        "Descargar predicciones",
+                        data=lambda: Path(ruta).read_bytes(),
+                        file_name=f"predicciones.{resultado['formato']}",
+                        mime="text/csv" if resultado["formato"] == "csv" else "application/octet-stream",
+                        on_click="ignore",
+                    )
 
     
     # === GRÁFICA DESPUÉS DEL BOTÓN DE PREDICCIÓN ===
-    if st.session_state.get("df_predicho") is not None:
+    resultado = buscar_resultado(cache_predicciones(), st.session_state.get("clave_prediccion"))
+    if resultado is not None and resultado["filas"] > 0:
         st.markdown("### Distribución de Predicciones")
 
-        df_plot = st.session_state.df_predicho.copy()
+        # Tabla de conteos región × categoría × clase que dejó la puntuación
+        conteos = resultado["conteos"]
 
         # Obtener regiones únicas
-        regiones = sorted(df_plot['region'].dropna().unique().tolist())
+        regiones = sorted(conteos['region'].dropna().unique().tolist())
         opciones = ['Todas'] + regiones
 
         # === Estilo CSS de los radio buttons como en tu imagen ===
@@ -198,14 +390,14 @@ def vista_exploracion():
 
         region_seleccionada = st.radio("Filtra por región", opciones, index=0)
 
-        if region_seleccionada != 'Todas':
-            df_plot = df_plot[df_plot['region'] == region_seleccionada]
+        df_plot = conteos_por_categoria(conteos, region_seleccionada)
 
         # Graficar
         try:
-            fig = px.histogram(
+            fig = px.bar(
                 df_plot,
                 x="categoria_de_productos",
+                y="Cantidad",
                 color="Predicción",
                 barmode="group",
                 title=f"Distribución de Predicciones por Categoría {'(todas las regiones)' if region_seleccionada == 'Todas' else f'en {region_seleccionada}'}",
@@ -0,0 +1,499 @@
+import multiprocessing
+import pickle
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from sklearn.preprocessing import StandardScaler  # type: ignore
+from imblearn.over_sampling import SMOTE  # type: ignore
+from imblearn.under_sampling import EditedNearestNeighbours  # type: ignore
+from sklearn.model_selection import train_test_split  # type: ignore
+from sklearn.neighbors import KNeighborsClassifier, NearestNeighbors  # type: ignore
+from sklearn.cluster import MiniBatchKMeans  # type: ignore
+from sklearn.linear_model import LogisticRegression  # type: ignore
+from sklearn.ensemble import HistGradientBoostingClassifier  # type: ignore
+from sklearn.naive_bayes import GaussianNB  # type: ignore
+from sklearn.metrics import classification_report  # type: ignore
+from modelos import guardar_modelo
+from codificacion import ajustar_codificador, codificar
+
+ETAPAS = ["Codificación", "Escalado", "Remuestreo", "Ajuste", "Condensación", "Evaluación",
+          "Comparación de backends", "Ranking de modelos"]
+
+COLUMNAS_A_ELIMINAR = ['precio', 'pago', 'costo_de_flete', 'numero_de_producto_id',
+                       'categoria_nombre_producto', 'tipo_de_pago', 'estado_del_pedido',
+                       'secuencia_corregida', 'frecuencia_de_compra_cliente']
+
+# === ESTRATEGIAS DE REMUESTREO ===
+# La limpieza ENN busca vecinos sobre todo el conjunto sobremuestreado y es lo
+# que más tarda. 'smoteenn' reproduce exactamente SMOTEENN(random_state=42)
+# (SMOTE y luego ENN con sampling_strategy="all"); las demás cambian un poco de
+# exactitud por tiempo: submuestreo estratificado a un máximo de filas antes
+# de SMOTE, ENN con búsqueda de vecinos en paralelo, o SMOTE sin limpieza.
+
+ESTRATEGIAS_REMUESTREO = {
+    "smoteenn": "SMOTE + ENN",
+    "submuestreo": "Submuestreo estratificado + SMOTE + ENN",
+    "enn_paralelo": "SMOTE + ENN en paralelo",
+    "smote": "Solo SMOTE",
+}
+
+FILAS_MAX_REMUESTREO = 50_000
+
+def remuestrear(X, y, estrategia="smoteenn", filas_max=FILAS_MAX_REMUESTREO, n_jobs=-1, random_state=42):
+    if estrategia not in ESTRATEGIAS_REMUESTREO:
+        raise ValueError(f"Estrategia de remuestreo desconocida: {estrategia}")
+
+    tiempos, distribucion = {}, {"Original": Counter(y)}
+
+    if estrategia == "submuestreo" and len(y) > filas_max:
+        inicio = time.perf_counter()
+        X, _, y, _ = train_test_split(X, y, train_size=filas_max, stratify=y, random_state=random_state)
+        tiempos["Submuestreo"] = time.perf_counter() - inicio
+        distribucion["Submuestreo"] = Counter(y)
+
+    inicio = time.perf_counter()
+    X, y = SMOTE(random_state=random_state).fit_resample(X, y)
+    tiempos["SMOTE"] = time.perf_counter() - inicio
+    distribucion["SMOTE"] = Counter(y)
+
+    if estrategia != "smote":
+        inicio = time.perf_counter()
+        enn = EditedNearestNeighbours(sampling_strategy="all", n_jobs=None if estrategia == "smoteenn" else n_jobs)
+        X, y = enn.fit_resample(X, y)
+        tiempos["ENN"] = time.perf_counter() - inicio
+        distribucion["ENN"] = Counter(y)
+
+    distribucion = pd.DataFrame(distribucion).fillna(0).astype(int).sort_index()
+    distribucion.index.name = 'Clase'
+    return X, y, tiempos, distribucion
+
+# === BACKEND DE BÚSQUEDA DE VECINOS ===
+# 'brute' calcula distancias con BLAS y se ajusta en float32 (la mitad de
+# memoria y de ancho de banda); los árboles trabajan en float64 internamente.
+# Las consultas se convierten al tipo del modelo en predecir(). n_jobs reparte
+# las filas a predecir entre los núcleos.
+
+ALGORITMOS_VECINOS = {
+    "auto": "Automático (scikit-learn)",
+    "brute": "Fuerza bruta (BLAS, float32)",
+    "kd_tree": "KD-tree",
+    "ball_tree": "Ball-tree",
+}
+
+MUESTRA_COMPARACION = 2_000
+
+def tipo_datos(algoritmo):
+    return "float32" if algoritmo == "brute" else "float64"
+
+def crear_knn(n_neighbors, algoritmo="auto", n_jobs=-1):
+    if algoritmo not in ALGORITMOS_VECINOS:
+        raise ValueError(f"Backend de vecinos desconocido: {algoritmo}")
+    return KNeighborsClassifier(n_neighbors=n_neighbors, algorithm=algoritmo, n_jobs=n_jobs)
+
+def predecir(modelo, X, estimador="knn"):
+    if estimador == "knn":
+        return modelo["knn"].predict(np.asarray(X, dtype=modelo["tipo_datos"]))
+    return modelo["estimadores"][estimador].predict(np.asarray(X, dtype=np.float64))
+
+def comparar_algoritmos(X_train, y_train, X_consulta, n_neighbors=5, n_jobs=-1):
+    # Pequeño benchmark con los datos reales: ajuste completo y predicción de
+    # una muestra fija de filas para cada backend
+    X_consulta = X_consulta[:MUESTRA_COMPARACION]
+    filas = []
+    for algoritmo in ALGORITMOS_VECINOS:
+        if algoritmo == "auto":
+            continue
+        tipo = tipo_datos(algoritmo)
+        knn = crear_knn(n_neighbors, algoritmo, n_jobs)
+
+        inicio = time.perf_counter()
+        knn.fit(np.asarray(X_train, dtype=tipo), y_train)
+        ajuste = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        knn.predict(np.asarray(X_consulta, dtype=tipo))
+        prediccion = time.perf_counter() - inicio
+
+        filas.append({
+            "Backend": ALGORITMOS_VECINOS[algoritmo],
+            "Ajuste (s)": round(ajuste, 4),
+            "Predicción (s)": round(prediccion, 4),
+            "ms por 1000 filas": round(1e6 * prediccion / max(len(X_consulta), 1), 2),
+        })
+    return pd.DataFrame(filas).sort_values("Predicción (s)", ignore_index=True)
+
+# === BARRIDO DE n_neighbors CON UN SOLO GRAFO DE VECINOS ===
+# El ajuste de KNN solo guarda los datos, así que probar otro k no requiere
+# reentrenar: basta con los k_max vecinos de cada fila de prueba, buscados una
+# vez (en paralelo con n_jobs). Los votos se acumulan vecino por vecino y la
+# predicción para cada k es la clase con más votos entre los k primeros; los
+# empates van a la clase menor, igual que KNeighborsClassifier.predict.
+
+K_MAX_BARRIDO = 30
+
+def predicciones_por_k(knn, y_train, X, k_max):
+    vecinos = knn.kneighbors(X, n_neighbors=k_max, return_distance=False)
+    codigos = np.searchsorted(knn.classes_, np.asarray(y_train)[vecinos])
+
+    filas = np.arange(len(X))
+    votos = np.zeros((len(X), len(knn.classes_)), dtype=np.int32)
+    predicciones = np.empty((k_max, len(X)), dtype=knn.classes_.dtype)
+    for k in range(k_max):
+        votos[filas, codigos[:, k]] += 1
+        predicciones[k] = knn.classes_[votos.argmax(axis=1)]
+    return predicciones
+
+def tabla_barrido(y_test, predicciones):
+    filas = []
+    for k, y_pred in enumerate(predicciones, start=1):
+        reporte = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+        filas.append({
+            "k": k,
+            "Exactitud": reporte["accuracy"],
+            "Precisión (macro)": reporte["macro avg"]["precision"],
+            "Recall (macro)": reporte["macro avg"]["recall"],
+            "F1 (macro)": reporte["macro avg"]["f1-score"],
+        })
+    return pd.DataFrame(filas).round(4)
+
+# === CONDENSACIÓN DEL MODELO ===
+# Un KNN guarda todas las filas de entrenamiento y predice contra todas. La
+# condensación deja solo un subconjunto representativo, guardado en float32:
+# - 'cnn': Condensed Nearest Neighbour de Hart por lotes; se agregan al
+#   almacén solo las filas que el almacén actual clasifica mal (1-NN).
+# - 'enn': Edited Nearest Neighbour; quita las filas que sus vecinos contradicen.
+# - 'prototipos': centroides de MiniBatchKMeans dentro de cada clase.
+
+CONDENSACIONES = {
+    "ninguna": "Sin condensación",
+    "cnn": "Condensed Nearest Neighbour",
+    "enn": "Edited Nearest Neighbour",
+    "prototipos": "Prototipos por clase (k-means)",
+}
+
+LOTE_CNN = 1_000
+PASADAS_CNN = 2
+FRACCION_PROTOTIPOS = 0.1
+
+def _condensar_cnn(X, y, random_state=42):
+    orden = np.random.default_rng(random_state).permutation(len(y))
+    en_almacen = np.zeros(len(y), dtype=bool)
+    # Una fila semilla por clase
+    for clase in np.unique(y):
+        en_almacen[orden[np.argmax(y[orden] == clase)]] = True
+
+    for _ in range(PASADAS_CNN):
+        agregadas = 0
+        for inicio in range(0, len(orden), LOTE_CNN):
+            lote = orden[inicio:inicio + LOTE_CNN]
+            lote = lote[~en_almacen[lote]]
+            if len(lote) == 0:
+                continue
+            almacen = np.flatnonzero(en_almacen)
+            vecino = NearestNeighbors(n_neighbors=1).fit(X[almacen]).kneighbors(X[lote], return_distance=False)[:, 0]
+            mal_clasificadas = lote[y[almacen][vecino] != y[lote]]
+            en_almacen[mal_clasificadas] = True
+            agregadas += len(mal_clasificadas)
+        if agregadas == 0:
+            break
+    return X[en_almacen], y[en_almacen]
+
+def _condensar_prototipos(X, y, n_neighbors, random_state=42):
+    X_prototipos, y_prototipos = [], []
+    for clase in np.unique(y):
+        X_clase = X[y == clase]
+        n_prototipos = min(len(X_clase), max(n_neighbors, int(len(X_clase) * FRACCION_PROTOTIPOS)))
+        kmeans = MiniBatchKMeans(n_clusters=n_prototipos, random_state=random_state, n_init=3)
+        kmeans.fit(X_clase)
+        X_prototipos.append(kmeans.cluster_centers_)
+        y_prototipos.append(np.full(n_prototipos, clase, dtype=y.dtype))
+    return np.vstack(X_prototipos), np.concatenate(y_prototipos)
+
+def condensar(X, y, metodo, n_neighbors=5, n_jobs=-1):
+    if metodo not in CONDENSACIONES:
+        raise ValueError(f"Condensación desconocida: {metodo}")
+    X = np.asarray(X, dtype=np.float64)
+    if metodo == "cnn":
+        X, y = _condensar_cnn(X, y)
+    elif metodo == "enn":
+        X, y = EditedNearestNeighbours(sampling_strategy="all", n_jobs=n_jobs).fit_resample(X, y)
+    elif metodo == "prototipos":
+        X, y = _condensar_prototipos(X, y, n_neighbors)
+
+    if len(y) < n_neighbors:
+        raise ValueError(
+            f"La condensación '{CONDENSACIONES[metodo]}' dejó {len(y)} filas, "
+            f"menos que n_neighbors={n_neighbors}; elige otra condensación."
+        )
+    return X.astype(np.float32), y
+
+def medir_modelo(knn, X_consulta, y_consulta, nombre):
+    # Tamaño serializado, latencia de predicción y métricas sobre el conjunto de prueba
+    inicio = time.perf_counter()
+    y_pred = knn.predict(X_consulta)
+    latencia = time.perf_counter() - inicio
+    reporte = classification_report(y_consulta, y_pred, output_dict=True, zero_division=0)
+    return {
+        "Modelo": nombre,
+        "Filas guardadas": int(knn.n_samples_fit_),
+        "Tamaño (MB)": round(len(pickle.dumps(knn)) / 1024 ** 2, 3),
+        "ms por 1000 filas": round(1e6 * latencia / max(len(X_consulta), 1), 2),
+        "Exactitud": round(reporte["accuracy"], 4),
+        "F1 (macro)": round(reporte["macro avg"]["f1-score"], 4),
+    }
+
+# === REGISTRO DE ESTIMADORES ===
+# Otros clasificadores detrás de la misma interfaz (fit/predict sobre la matriz
+# escalada). Se entrenan con la misma partición que el KNN y el ranking mide
+# tiempo de ajuste, latencia por fila, tamaño serializado y F1 macro, para
+# elegir desde la vista cuál modelo responde las predicciones.
+
+ESTIMADORES = {
+    "knn": "K vecinos más cercanos",
+    "logistica": "Regresión logística",
+    "gradient_boosting": "Gradient boosting (histogramas)",
+    "naive_bayes": "Naive Bayes gaussiano",
+}
+
+def crear_estimador(nombre):
+    if nombre == "logistica":
+        return LogisticRegression(max_iter=1000)
+    if nombre == "gradient_boosting":
+        return HistGradientBoostingClassifier(random_state=42)
+    if nombre == "naive_bayes":
+        return GaussianNB()
+    raise ValueError(f"Estimador desconocido: {nombre}")
+
+def fila_ranking(nombre, estimador, ajuste, X_muestra, y_test, y_pred):
+    inicio = time.perf_counter()
+    estimador.predict(X_muestra)
+    latencia = time.perf_counter() - inicio
+    reporte = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+    return {
+        "Modelo": ESTIMADORES[nombre],
+        "Ajuste (s)": round(ajuste, 4),
+        "µs por fila": round(1e6 * latencia / max(len(X_muestra), 1), 2),
+        "Tamaño (MB)": round(len(pickle.dumps(estimador)) / 1024 ** 2, 3),
+        "Exactitud": round(reporte["accuracy"], 4),
+        "F1 (macro)": round(reporte["macro avg"]["f1-score"], 4),
+    }
+
+def entrenar_estimadores(X_train, y_train, X_test, y_test, knn=None):
+    # knn: (modelo, segundos de ajuste, X de prueba en su tipo, y_pred) ya calculados
+    estimadores, predicciones, filas = {}, {}, []
+    if knn is not None:
+        modelo_knn, ajuste, X_prueba_knn, y_pred = knn
+        predicciones["knn"] = y_pred
+        filas.append(fila_ranking("knn", modelo_knn, ajuste, X_prueba_knn[:MUESTRA_COMPARACION], y_test, y_pred))
+
+    for nombre in ESTIMADORES:
+        if nombre == "knn":
+            continue
+        estimador = crear_estimador(nombre)
+        inicio = time.perf_counter()
+        estimador.fit(X_train, y_train)
+        ajuste = time.perf_counter() - inicio
+
+        estimadores[nombre] = estimador
+        predicciones[nombre] = estimador.predict(X_test)
+        filas.append(fila_ranking(nombre, estimador, ajuste, X_test[:MUESTRA_COMPARACION], y_test, predicciones[nombre]))
+
+    ranking = pd.DataFrame(filas, index=pd.Index(list(predicciones), name="Clave"))
+    return estimadores, predicciones, ranking.sort_values("F1 (macro)", ascending=False)
+
+# === ENTRENAMIENTO DEL MODELO KNN ===
+# Sin Streamlit: se puede ejecutar en el hilo de la vista o en un proceso
+# aparte. 'reportar' recibe el nombre de cada etapa al empezarla. Devuelve un
+# diccionario de artefactos, que es lo que se guarda en el almacén de modelos.
+
+def entrenar_knn(df_original, n_neighbors=5, reportar=None, estrategia="smoteenn",
+                 filas_max=FILAS_MAX_REMUESTREO, algoritmo="auto", condensacion="ninguna",
+                 comparar_backends=False, n_jobs=-1):
+    reportar = reportar or (lambda etapa: None)
+    tiempos = {}
+
+    def etapa(nombre):
+        # Cierra el cronómetro de la etapa anterior y abre el de la siguiente
+        ahora = time.perf_counter()
+        if tiempos:
+            anterior = list(tiempos)[-1]
+            tiempos[anterior] = ahora - tiempos[anterior]
+        if nombre is not None:
+            tiempos[nombre] = ahora
+            reportar(nombre)
+
+    etapa("Codificación")
+    df = df_original.drop(columns=COLUMNAS_A_ELIMINAR)
+
+    y = df["tipo_entrega_clase"].to_numpy()
+    df = df.drop(columns=["tipo_entrega_clase"])
+
+    # El mismo codificador se guarda con el modelo y codifica los archivos subidos
+    columnas_categoricas = df.select_dtypes(include=['object', 'category']).columns.tolist()
+    codificador = ajustar_codificador(df, columnas_categoricas)
+    X, _ = codificar(codificador, df)
+    columnas_X = codificador["columnas"]
+
+    etapa("Escalado")
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    etapa("Remuestreo")
+    X_resampled, y_resampled, tiempos_remuestreo, distribucion = remuestrear(
+        X_scaled, y, estrategia, filas_max, n_jobs
+    )
+
+    X_train, X_test, y_train, y_test = train_test_split(X_resampled, y_resampled, test_size=0.3, random_state=42)
+
+    # El KNN trabaja con su propio tipo de datos (y, si se condensa, con su
+    # propio subconjunto); los demás estimadores usan la partición original
+    X_knn, y_knn = np.asarray(X_train, dtype=tipo_datos(algoritmo)), y_train
+    X_prueba_knn = np.asarray(X_test, dtype=tipo_datos(algoritmo))
+
+    etapa("Ajuste")
+    inicio_ajuste = time.perf_counter()
+    knn = crear_knn(n_neighbors, algoritmo, n_jobs)
+    knn.fit(X_knn, y_knn)
+    ajuste_knn = time.perf_counter() - inicio_ajuste
+
+    # Con condensación, el modelo servido se reajusta sobre el subconjunto en
+    # float32 con fuerza bruta: un árbol (kd_tree/ball_tree, o 'auto' cuando los
+    # elige) guarda además una copia float64 de las filas y el modelo "compacto"
+    # terminaría pesando más. Se guarda la comparación contra el modelo completo
+    tipo_modelo = tipo_datos(algoritmo)
+    resumen_condensacion = None
+    if condensacion != "ninguna":
+        etapa("Condensación")
+        original = medir_modelo(knn, X_prueba_knn, y_test, "Completo")
+        X_knn, y_knn = condensar(X_knn, y_knn, condensacion, n_neighbors, n_jobs)
+        tipo_modelo = tipo_datos("brute")
+        X_prueba_knn = X_prueba_knn.astype(np.float32)
+        inicio_ajuste = time.perf_counter()
+        knn = crear_knn(n_neighbors, "brute", n_jobs)
+        knn.fit(X_knn, y_knn)
+        ajuste_knn = time.perf_counter() - inicio_ajuste
+        resumen_condensacion = pd.DataFrame([
+            original, medir_modelo(knn, X_prueba_knn, y_test, CONDENSACIONES[condensacion])
+        ])
+
+    # Una sola búsqueda de vecinos da la evaluación del modelo y el barrido de k
+    etapa("Evaluación")
+    k_max = min(max(K_MAX_BARRIDO, n_neighbors), len(X_knn))
+    predicciones = predicciones_por_k(knn, y_knn, X_prueba_knn, k_max)
+    y_pred = predicciones[n_neighbors - 1]
+    barrido = tabla_barrido(y_test, predicciones)
+
+    # El benchmark reajusta un KNN por backend: solo corre si se pide
+    comparacion = None
+    if comparar_backends:
+        etapa("Comparación de backends")
+        comparacion = comparar_algoritmos(X_knn, y_knn, X_prueba_knn, n_neighbors, n_jobs)
+
+    etapa("Ranking de modelos")
+    estimadores, predicciones_estimadores, ranking = entrenar_estimadores(
+        X_train, y_train, X_test, y_test,
+        knn=(knn, ajuste_knn, X_prueba_knn, y_pred),
+    )
+    etapa(None)
+
+    return {
+        "knn": knn,
+        # Backend pedido al crear el KNN servido ('brute' si se condensó)
+        "algoritmo": knn.algorithm,
+        "tipo_datos": tipo_modelo,
+        "scaler": scaler,
+        "codificador": codificador,
+        "columnas_X": columnas_X,
+        "y_test": y_test,
+        "y_pred": y_pred,
+        "estimadores": estimadores,
+        "predicciones_estimadores": predicciones_estimadores,
+        "ranking": ranking,
+        "barrido": barrido,
+        "comparacion": comparacion,
+        "condensacion": resumen_condensacion,
+        "estrategia": estrategia,
+        "distribucion": distribucion,
+        "tiempos": tiempos,
+        "tiempos_remuestreo": tiempos_remuestreo,
+        # Columnas y tipo de la matriz codificada que recibe el modelo
+        "tipos_post": pd.Series(X.dtype.name, index=columnas_X),
+    }
+
+# === ENTRENAMIENTO EN SEGUNDO PLANO ===
+# Un pool de procesos por servidor (el hilo de Streamlit nunca entrena) y un
+# registro de trabajos por clave de modelo: si varias sesiones piden el mismo
+# modelo, comparten un único trabajo. El proceso hijo avisa cada etapa en un
+# diccionario del Manager y, al terminar, deja el modelo en el almacén en
+# disco, de donde lo toman todas las sesiones y todos los workers.
+
+def crear_gestor(max_workers=1):
+    # 'spawn' en todas las plataformas: hacer fork del servidor de Streamlit, que
+    # ya tiene hilos y BLAS en marcha, puede bloquearse, y Windows no tiene fork.
+    # El hijo importa el script de la página como __mp_main__ (Page1.py solo
+    # dibuja bajo __main__) y toma el trabajo de esta función de nivel de módulo
+    contexto = multiprocessing.get_context("spawn")
+    return {
+        "contexto": contexto,
+        "max_workers": max_workers,
+        "pool": ProcessPoolExecutor(max_workers=max_workers, mp_context=contexto),
+        "manager": contexto.Manager(),
+        "trabajos": {},
+        "candado": threading.Lock(),
+    }
+
+def _enviar(gestor, *argumentos):
+    # Si un worker murió (p. ej. sin memoria en SMOTEENN) el pool queda roto y
+    # todo submit falla con BrokenProcessPool: se descarta y se crea uno nuevo
+    with gestor["candado"]:
+        try:
+            return gestor["pool"].submit(_entrenar_y_guardar, *argumentos)
+        except BrokenProcessPool:
+            gestor["pool"].shutdown(wait=False, cancel_futures=True)
+            gestor["pool"] = ProcessPoolExecutor(max_workers=gestor["max_workers"], mp_context=gestor["contexto"])
+            return gestor["pool"].submit(_entrenar_y_guardar, *argumentos)
+
+def _entrenar_y_guardar(df_original, clave, parametros, progreso):
+    def reportar(etapa):
+        progreso["etapa"] = etapa
+
+    artefactos = entrenar_knn(df_original, reportar=reportar, **parametros)
+    progreso["etapa"] = "Guardando"
+    guardar_modelo(clave, artefactos)
+    return clave
+
+def enviar_entrenamiento(gestor, df_original, clave, reintentar=False, **parametros):
+    trabajo = gestor["trabajos"].get(clave)
+    # Un trabajo en curso se reutiliza y uno que falló se conserva con su error
+    # hasta que el usuario pida reintentar; uno terminado cuyo modelo ya no
+    # está en disco (se borró) se vuelve a enviar
+    if trabajo is not None:
+        futuro = trabajo["futuro"]
+        if not futuro.done() or (futuro.exception() is not None and not reintentar):
+            return trabajo
+
+    progreso = gestor["manager"].dict(etapa="En cola")
+    trabajo = {
+        "clave": clave,
+        "progreso": progreso,
+        "inicio": time.time(),
+        "futuro": _enviar(gestor, df_original, clave, parametros, progreso),
+    }
+    gestor["trabajos"][clave] = trabajo
+    return trabajo
+
+def estado_trabajo(trabajo):
+    futuro = trabajo["futuro"]
+    etapa = trabajo["progreso"].get("etapa", "En cola")
+    error = futuro.exception() if futuro.done() else None
+    return {
+        "etapa": etapa,
+        "avance": (ETAPAS.index(etapa) / len(ETAPAS)) if etapa in ETAPAS else (1.0 if etapa == "Guardando" else 0.0),
+        "terminado": futuro.done() and error is None,
+        "error": error,
+        "segundos": time.time() - trabajo["inicio"],
+    }
@@ -0,0 +1,121 @@
+import numpy as np  # type: ignore
+import plotly.express as px  # type: ignore
+import plotly.graph_objects as go  # type: ignore
+
+# === DISPERSIÓN CON RENDER SEGÚN EL TAMAÑO ===
+# Hasta UMBRAL_WEBGL puntos se dibuja en SVG como siempre (un marcador con
+# contorno por pedido). Por encima se usa Scattergl, que el navegador pinta con
+# la GPU. Por encima de UMBRAL_DENSIDAD ya no se envían puntos: la densidad se
+# agrupa en el servidor en una rejilla de CELDAS_DENSIDAD × CELDAS_DENSIDAD y se
+# dibuja un mapa de calor por clase, así que el tamaño del HTML queda acotado
+# sin importar cuántas filas haya.
+
+UMBRAL_WEBGL = 10_000
+UMBRAL_DENSIDAD = 200_000
+CELDAS_DENSIDAD = 80
+
+def modo_dispersion(filas):
+    if filas > UMBRAL_DENSIDAD:
+        return "densidad"
+    if filas > UMBRAL_WEBGL:
+        return "webgl"
+    return "svg"
+
+def _rgba(color, alfa):
+    color = color.lstrip("#")
+    r, g, b = (int(color[i:i + 2], 16) for i in (0, 2, 4))
+    return f"rgba({r},{g},{b},{alfa})"
+
+def _bordes(valores):
+    minimo, maximo = valores.min(), valores.max()
+    if minimo == maximo:
+        minimo, maximo = minimo - 0.5, maximo + 0.5
+    return np.linspace(minimo, maximo, CELDAS_DENSIDAD + 1)
+
+def _densidad_por_clase(df, x, y, color, colores, etiquetas, opacidad):
+    valores_x = df[x].to_numpy(dtype=np.float64)
+    valores_y = df[y].to_numpy(dtype=np.float64)
+    # Bordes comunes a todas las clases para que las celdas se superpongan
+    bordes_x, bordes_y = _bordes(valores_x), _bordes(valores_y)
+    centros_x = (bordes_x[:-1] + bordes_x[1:]) / 2
+    centros_y = (bordes_y[:-1] + bordes_y[1:]) / 2
+
+    clases = df[color].to_numpy()
+    fig = go.Figure()
+    for clase, tono in colores.items():
+        mascara = clases == clase
+        if not mascara.any():
+            continue
+        conteo, _, _ = np.histogram2d(valores_x[mascara], valores_y[mascara], bins=[bordes_x, bordes_y])
+        # Celdas vacías transparentes; filas = eje y
+        z = np.where(conteo > 0, conteo, np.nan).T
+        fig.add_trace(go.Heatmap(
+            x=centros_x,
+            y=centros_y,
+            z=z,
+            name=str(clase),
+            colorscale=[[0, _rgba(tono, 0.25)], [1, _rgba(tono, 1)]],
+            opacity=opacidad,
+            showscale=False,
+            showlegend=True,
+            hovertemplate=(
+                f"{etiquetas.get(color, color)}={clase}<br>{etiquetas.get(x, x)}≈%{{x:,.0f}}"
+                f"<br>{etiquetas.get(y, y)}≈%{{y:,.2f}}<br>Pedidos: %{{z:,}}<extra></extra>"
+            ),
+        ))
+
+    fig.update_layout(
+        xaxis_title=etiquetas.get(x, x),
+        yaxis_title=etiquetas.get(y, y),
+        legend_title_text=etiquetas.get(color, color),
+    )
+    return fig
+
+def dispersion_por_clase(df, x, y, color, colores, etiquetas, opacidad=0.7):
+    # df ya filtrado y sin nulos en x e y; colores: {clase: "#rrggbb"}
+    modo = modo_dispersion(len(df))
+    if modo == "densidad":
+        return _densidad_por_clase(df, x, y, color, colores, etiquetas, opacidad)
+
+    fig = px.scatter(
+        df,
+        x=x,
+        y=y,
+        color=color,
+        color_discrete_map=colores,
+        labels=etiquetas,
+        opacity=opacidad,
+        render_mode="webgl" if modo == "webgl" else "svg",
+    )
+    fig.update_traces(marker=dict(size=7, line=dict(width=0.5, color='black')))
+    return fig
+
+# === LOLLIPOP DE UN HISTOGRAMA DE DÍAS ===
+# Dos trazas fijas sin importar el rango de días: todos los palitos en una sola
+# traza de líneas (segmentos separados por NaN) y las cabezas en otra de marcadores.
+
+def lollipop(conteo_por_dia, color_linea, color_punto):
+    # conteo_por_dia: Serie indexada por día con la cantidad de entregas
+    dias = np.asarray(conteo_por_dia.index, dtype=np.float64)
+    conteos = np.asarray(conteo_por_dia.to_numpy(), dtype=np.float64)
+    separador = np.full(len(dias), np.nan)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=np.column_stack([dias, dias, separador]).ravel(),
+        y=np.column_stack([np.zeros(len(dias)), conteos, separador]).ravel(),
+        mode="lines",
+        line=dict(color=color_linea, width=2),
+        connectgaps=False,
+        showlegend=False,
+        hoverinfo="skip"
+    ))
+    fig.add_trace(go.Scatter(
+        x=conteo_por_dia.index,
+        y=conteo_por_dia.values,
+        mode="markers",
+        marker=dict(color=color_punto, size=8, line=dict(width=1, color=color_punto)),
+        hovertemplate="Día %{x}<br>Cantidad: %{y}<extra></extra>",
+        showlegend=False
+    ))
+    return fig
@@ -0,0 +1,58 @@
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+# === ÍNDICE INVERTIDO PARA LOS FILTROS DEL DASHBOARD ===
+# Para cada dimensión de filtro se guarda, por valor, el arreglo ordenado de
+# posiciones de fila (int32). Una combinación de filtros se resuelve
+# intersectando esos arreglos, empezando por el más corto, sin recorrer ni
+# copiar el DataFrame completo.
+
+def construir_indice(dimensiones):
+    # dimensiones: {nombre: Serie alineada con el DataFrame}
+    indice = {}
+    for nombre, serie in dimensiones.items():
+        codigos, valores = pd.factorize(serie, sort=True)
+        orden = np.argsort(codigos, kind="stable").astype(np.int32)
+        limites = np.searchsorted(codigos[orden], np.arange(len(valores) + 1))
+
+        # Las claves son texto para que '2017-02' encuentre al Period('2017-02')
+        indice[nombre] = {
+            str(valor): orden[limites[i]:limites[i + 1]]
+            for i, valor in enumerate(valores)
+        }
+    return indice
+
+def resolver_filtros(indice, filtros):
+    # filtros: {nombre: valor}; None o 'Todos' significa "sin filtrar"
+    listas = []
+    for nombre, valor in filtros.items():
+        if valor is None or valor == 'Todos':
+            continue
+        listas.append(indice[nombre].get(str(valor), np.empty(0, dtype=np.int32)))
+
+    if not listas:
+        return None  # Sin filtros: todas las filas
+
+    listas.sort(key=len)
+    filas = listas[0]
+    for otra in listas[1:]:
+        if len(filas) == 0:
+            break
+        # Búsqueda binaria de la lista corta en la larga: O(corta · log larga)
+        posiciones = np.minimum(np.searchsorted(otra, filas), len(otra) - 1)
+        filas = filas[otra[posiciones] == filas]
+    return filas
+
+def seleccionar_filas(df, filas):
+    return df if filas is None else df.iloc[filas]
+
+def filtro_tipo_entrega(tipo_entrega, dimension='tipo_entrega'):
+    # "Prime (0–3 días)" -> {'tipo_entrega': 'Prime'}; la opción general
+    # conserva solo las filas con una clase de entrega válida (0 a 30 días)
+    tipo = tipo_entrega.split()[0]
+    if tipo in ("Prime", "Express", "Regular"):
+        return {dimension: tipo}
+    return {f"{dimension}_valida": True}
+
+def dimensiones_entrega(clase, dimension='tipo_entrega'):
+    return {dimension: clase, f"{dimension}_valida": clase.notna()}
@@ -1,36 +1,22 @@
 import pandas as pd  # type: ignore
 from pathlib import Path
 import numpy as np  # type: ignore
-import plotly.express as px  # type: ignore
 import streamlit as st  # type: ignore
 import plotly.graph_objects as go  # type: ignore
+from cargador import cargar_normalizado, tipar_columnas, proyectar, huella_archivo
+from memoria import reducir_memoria
+from indices import construir_indice, resolver_filtros, seleccionar_filas
+from indices import filtro_tipo_entrega, dimensiones_entrega
+from cubo import construir_cubo, agregar, histograma, mediana_histograma
+from retencion import construir_motor_retencion, tasa_retencion
+from retencion import matriz_cohortes, porcentaje_cohortes
+from graficas import dispersion_por_clase, lollipop
 
-def mostrar_linea_distribucion_entregas(dias_filtrados, rango):
-    conteo_por_dia = dias_filtrados.value_counts().sort_index()
-    conteo_por_dia = pd.Series(index=rango, dtype=int).fillna(0).add(conteo_por_dia, fill_value=0).astype(int)
-
-    fig = go.Figure()
-
-    # === Líneas verticales de cada punto
-    for x, y in zip(conteo_por_dia.index, conteo_por_dia.values):
-        fig.add_trace(go.Scatter(
-            x=[x, x],
-            y=[0, y],
-            mode="lines",
-            line=dict(color="#5399df", width=2),
-            showlegend=False,
-            hoverinfo="skip"
-        ))
-
-    # === Puntos (lollipop heads)
-    fig.add_trace(go.Scatter(
-        x=conteo_por_dia.index,
-        y=conteo_por_dia.values,
-        mode="markers",
-        marker=dict(color="#263cbb", size=8, line=dict(width=1, color='#263cbb')),
-        hovertemplate="Día %{x}<br>Cantidad: %{y}<extra></extra>",
-        showlegend=False  
-    ))
+def mostrar_linea_distribucion_entregas(conteo_por_dia):
+    # conteo_por_dia: Serie indexada por día con la cantidad de entregas
+
+    # === Palitos y cabezas en dos trazas, sin importar el rango de días
+    fig = lollipop(conteo_por_dia, color_linea="#5399df", color_punto="#263cbb")
 
     fig.update_layout(
         height=210,
@@ -59,113 +45,155 @@ def mostrar_linea_distribucion_entregas(dias_filtrados, rango):
 
     return fig
 
-@st.cache_data(show_spinner="Cargando base de datos...")
+def normalizar_datos(df):
+    if 'id_único_de_cliente' not in df.columns or 'orden_compra_timestamp_fecha' not in df.columns:
+        raise ValueError("El archivo no contiene las columnas necesarias.")
+
+    df['orden_compra_timestamp_fecha'] = pd.to_datetime(df['orden_compra_timestamp_fecha'])
+    df['periodo'] = df['orden_compra_timestamp_fecha'].dt.to_period('M')
+    df['mes'] = df['orden_compra_timestamp_fecha'].dt.strftime('%B')
+
+    # === Tipos finales y clase de entrega, una sola vez por carga ===
+    if 'volumen' not in df.columns:
+        df['volumen'] = np.nan
+    df = tipar_columnas(df, ['volumen', 'costo_de_flete', 'valor_total', 'tiempo_total_entrega_dias'])
+    return reducir_memoria(df)
+
+# === Columnas de UPDINTEGRADO.xlsx que usa vista_inicio (el resto no se carga) ===
+COLUMNAS_VISTA_INICIO = (
+    'id_único_de_cliente',
+    'orden_compra_timestamp_fecha',
+    'categoria_de_productos',
+    'region',
+    'tiempo_total_entrega_dias',
+    'volumen',
+    'valor_total',
+    'costo_de_flete'
+)
+
+ARCHIVO_DATOS = Path("UPDINTEGRADO.xlsx")
+
+def huella_datos():
+    return huella_archivo(ARCHIVO_DATOS) if ARCHIVO_DATOS.exists() else None
+
 def cargar_datos():
-    archivo = Path("UPDINTEGRADO.xlsx")
-    if not archivo.exists():
+    huella = huella_datos()
+    if huella is None:
         return None, "Archivo UPDINTEGRADO.xlsx no encontrado."
-    try:
-        df = pd.read_excel(archivo)
-        if 'id_único_de_cliente' not in df.columns or 'orden_compra_timestamp_fecha' not in df.columns:
-            return None, "El archivo no contiene las columnas necesarias."
-
-        df['orden_compra_timestamp_fecha'] = pd.to_datetime(df['orden_compra_timestamp_fecha'])
-        df['periodo'] = df['orden_compra_timestamp_fecha'].dt.to_period('M')
-        df['volumen'] = pd.to_numeric(df.get('volumen', pd.Series()), errors='coerce')
-        df['mes'] = df['orden_compra_timestamp_fecha'].dt.strftime('%B')
+    return cargar_datos_version(huella)
 
+# === Cachés por versión del dataset: la huella es la clave ===
+@st.cache_resource(show_spinner="Cargando base de datos...", max_entries=2)
+def cargar_datos_version(huella):
+    try:
+        df = cargar_normalizado(ARCHIVO_DATOS, normalizar_datos, COLUMNAS_VISTA_INICIO)
         return df, None
     except Exception as e:
         return None, str(e)
 
-def aplicar_filtros(df, categoria, region, tipo_entrega, fecha_periodo):
-    if fecha_periodo is not None and fecha_periodo != 'Todos':
-        df = df[df['periodo'].astype(str) == fecha_periodo]
-
-    df_filtrado = df if categoria == 'Todos' else df[df['categoria_de_productos'] == categoria]
-
-    if 'region' in df_filtrado.columns:
-        df_region = df_filtrado if region == 'Todos' else df_filtrado[df_filtrado['region'] == region]
-    else:
-        df_region = df_filtrado.copy()
-
-    df_region = df_region.copy()
-    df_region['tiempo_total_entrega_dias'] = pd.to_numeric(df_region['tiempo_total_entrega_dias'], errors='coerce')
-
-    if tipo_entrega == "Prime (0–3 días)":
-        df_region = df_region[df_region['tiempo_total_entrega_dias'].between(0, 3)]
-    elif tipo_entrega == "Express (4–7 días)":
-        df_region = df_region[df_region['tiempo_total_entrega_dias'].between(4, 7)]
-    elif tipo_entrega == "Regular (8–30 días)":
-        df_region = df_region[df_region['tiempo_total_entrega_dias'].between(8, 30)]
-    else:
-        df_region = df_region[df_region['tiempo_total_entrega_dias'].between(0, 30)]
-
-    return df_filtrado, df_region
-
-def calcular_kpis(df, df_filtrado, df_region, tipo_entrega, categoria_seleccionada, region_seleccionada):
-    df_region['volumen'] = pd.to_numeric(df_region['volumen'], errors='coerce')
-    df_region['tiempo_total_entrega_dias'] = pd.to_numeric(df_region['tiempo_total_entrega_dias'], errors='coerce')
-
-    df_region['tipo_entrega'] = pd.cut(
-        df_region['tiempo_total_entrega_dias'],
-        bins=[-1, 3, 7, float('inf')],
-        labels=["Prime", "Express", "Regular"]
-    )
-
-    volumen_promedio = 0
-    df_categoria = df_region if categoria_seleccionada == 'Todos' else df_region[df_region['categoria_de_productos'] == categoria_seleccionada]
-    tipo = tipo_entrega.split()[0] if tipo_entrega != "De (0-30 días)" else None
-
-    if tipo:
-        df_tipo = df_categoria[df_categoria['tipo_entrega'] == tipo]
-        volumen_promedio = df_tipo['volumen'].mean()
-    else:
-        volumen_promedio = df_categoria['volumen'].mean()
+def construir_indice_upd(df):
+    dimensiones = {
+        'periodo': df['periodo'],
+        'categoria_de_productos': df['categoria_de_productos'],
+        **dimensiones_entrega(df['tipo_entrega'])
+    }
+    if 'region' in df.columns:
+        dimensiones['region'] = df['region']
+    return construir_indice(dimensiones)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def cargar_indice(huella):
+    df, error = cargar_datos_version(huella)
+    return None if error else construir_indice_upd(df)
+
+def filtrar_filas(indice, categoria, region, tipo_entrega, fecha_periodo):
+    filtros_base = {'periodo': fecha_periodo, 'categoria_de_productos': categoria}
+    filas_filtrado = resolver_filtros(indice, filtros_base)
+
+    filtros_region = dict(filtros_base)
+    if 'region' in indice:
+        filtros_region['region'] = region
+    filtros_region.update(filtro_tipo_entrega(tipo_entrega))
+    filas_region = resolver_filtros(indice, filtros_region)
+
+    return filas_filtrado, filas_region
+
+def aplicar_filtros(df, categoria, region, tipo_entrega, fecha_periodo, indice):
+    filas_filtrado, filas_region = filtrar_filas(indice, categoria, region, tipo_entrega, fecha_periodo)
+    return seleccionar_filas(df, filas_filtrado), seleccionar_filas(df, filas_region)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def cargar_motor_retencion(huella):
+    df, error = cargar_datos_version(huella)
+    return None if error else construir_motor_retencion(df['id_único_de_cliente'], df['periodo'])
+
+def construir_cubo_upd(df):
+    dimensiones = {
+        'categoria_de_productos': df['categoria_de_productos'],
+        'periodo': df['periodo'],
+        'tipo_entrega': df['tipo_entrega']
+    }
+    if 'region' in df.columns:
+        dimensiones['region'] = df['region']
+    medidas = {columna: df[columna] for columna in ['volumen', 'valor_total'] if columna in df.columns}
+    return construir_cubo(dimensiones, medidas, df['tiempo_total_entrega_dias'])
 
-    volumen_promedio = round(volumen_promedio, 2) if not pd.isna(volumen_promedio) else 0
+@st.cache_resource(show_spinner=False, max_entries=2)
+def cargar_cubo(huella):
+    df, error = cargar_datos_version(huella)
+    return None if error else construir_cubo_upd(df)
 
-    # === RETENCIÓN USANDO SOLO ALGUNOS FILTROS (df_filtrado) ===
+def seleccionar_filas_retencion(filas_filtrado, filas_region, tipo_entrega, categoria_seleccionada, region_seleccionada):
     if categoria_seleccionada == 'Todos' and region_seleccionada == 'Todos' and tipo_entrega == 'De (0-30 días)':
-        df_retencion = df_filtrado
-    else:
-        df_retencion = df_region
-
-    periodos_cat = df_retencion.groupby('id_único_de_cliente')['periodo'].nunique()
-    retenidos_cat = periodos_cat[periodos_cat > 1].count()
-    totales_cat = periodos_cat.count()
-    retencion_cat = (retenidos_cat / totales_cat) * 100 if totales_cat > 0 else 0
+        return filas_filtrado
+    return filas_region
+
+def calcular_kpis(cubo, motor, filas_filtrado, filas_region, tipo_entrega, categoria_seleccionada, region_seleccionada, fecha_periodo):
+    # === Filtros del cubo: los mismos que df_filtrado y df_region ===
+    filtros_filtrado = {'periodo': fecha_periodo, 'categoria_de_productos': categoria_seleccionada}
+    filtros_region = dict(filtros_filtrado)
+    if 'region' in cubo['valores']:
+        filtros_region['region'] = region_seleccionada
+    filtros_region.update(filtro_tipo_entrega(tipo_entrega))
+
+    por_tipo = agregar(cubo, filtros_region, por='tipo_entrega')
+    total_region = por_tipo.sum()
+
+    n_volumen = total_region['n_volumen']
+    volumen_promedio = round(total_region['suma_volumen'] / n_volumen, 2) if n_volumen > 0 else 0
+
+    # === RETENCIÓN USANDO SOLO ALGUNOS FILTROS (filas de df_filtrado) ===
+    filas_retencion = seleccionar_filas_retencion(
+        filas_filtrado, filas_region, tipo_entrega, categoria_seleccionada, region_seleccionada
+    )
+    retencion_cat = tasa_retencion(motor, filas_retencion)
     no_retenidos_cat = 100 - retencion_cat
 
-
-    dias = df_filtrado['tiempo_total_entrega_dias'].dropna()
-
     if tipo_entrega == "Prime (0–3 días)":
-        dias_filtrados = dias[dias.between(0, 3)]
         titulo_kpi = "Mediana de Entrega Prime"
         rango = range(0, 4)
     elif tipo_entrega == "Express (4–7 días)":
-        dias_filtrados = dias[dias.between(4, 7)]
         titulo_kpi = "Mediana de Entrega Express"
         rango = range(4, 8)
     elif tipo_entrega == "Regular (8–30 días)":
-        dias_filtrados = dias[dias.between(8, 30)]
         titulo_kpi = "Mediana de Entrega Regular"
         rango = range(8, 31)
     else:
-        dias_filtrados = dias[dias.between(0, 30)]
         titulo_kpi = "Mediana de Entrega"
         rango = range(0, 31)
 
-    promedio_filtrado = round(dias_filtrados.median()) if not dias_filtrados.empty else 0
+    # === Histograma de días (0-30) de df_filtrado recortado al rango del tipo ===
+    conteo_dias = histograma(cubo, filtros_filtrado)[rango.start:rango.stop]
+    mediana = mediana_histograma(conteo_dias, desde=rango.start)
+    promedio_filtrado = round(mediana) if mediana is not None else 0
 
     # Reemplazado KPI anterior por nuevo conteo de pedidos
-    num_pedidos = len(df_region)  
+    num_pedidos = int(total_region['n'])
 
     ahorro_prime = ahorro_express = None
-    if 'valor_total' in df_region.columns and 'tiempo_total_entrega_dias' in df_region.columns:
-        df_region['valor_total'] = pd.to_numeric(df_region['valor_total'], errors='coerce')
-        valor_promedio = df_region.groupby("tipo_entrega")["valor_total"].mean()
+    if 'valor_total' in cubo['medidas']:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            valor_promedio = por_tipo['suma_valor_total'] / por_tipo['n_valor_total']
         baseline = valor_promedio.get("Regular", None)
 
         if baseline and baseline > 0:
@@ -181,58 +209,31 @@ def calcular_kpis(df, df_filtrado, df_region, tipo_entrega, categoria_selecciona
         "num_pedidos": num_pedidos,  
         "ahorro_prime": ahorro_prime,
         "ahorro_express": ahorro_express,
-        "dias_filtrados": dias_filtrados,
+        "conteo_dias": pd.Series(conteo_dias, index=rango),
         "rango": rango
     }
 
-def obtener_top5_top_categorias(df, region_seleccionada, fecha_periodo, tipo_entrega):
-    df_filtrado = df.copy()
-
-    # === Aplicar filtro de fecha ===
-    if fecha_periodo is not None and fecha_periodo != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado['periodo'].astype(str) == fecha_periodo]
-
-    # === Aplicar filtro de región ===
-    if region_seleccionada != 'Todos':
-        df_filtrado = df_filtrado[df_filtrado['region'] == region_seleccionada]
-
-    # === Asegurar formato numérico ===
-    df_filtrado['tiempo_total_entrega_dias'] = pd.to_numeric(df_filtrado['tiempo_total_entrega_dias'], errors='coerce')
-
-    # === Aplicar filtro de tipo de entrega ===
-    if tipo_entrega == "Prime (0–3 días)":
-        df_filtrado = df_filtrado[df_filtrado['tiempo_total_entrega_dias'].between(0, 3)]
-    elif tipo_entrega == "Express (4–7 días)":
-        df_filtrado = df_filtrado[df_filtrado['tiempo_total_entrega_dias'].between(4, 7)]
-    elif tipo_entrega == "Regular (8–30 días)":
-        df_filtrado = df_filtrado[df_filtrado['tiempo_total_entrega_dias'].between(8, 30)]
-    else:
-        df_filtrado = df_filtrado[df_filtrado['tiempo_total_entrega_dias'].between(0, 30)]
+def obtener_top5_top_categorias(cubo, region_seleccionada, fecha_periodo, tipo_entrega):
+    # === Filtros de fecha, región y tipo de entrega sobre el cubo ===
+    filtros = {'periodo': fecha_periodo, 'region': region_seleccionada}
+    filtros.update(filtro_tipo_entrega(tipo_entrega))
+    conteos = agregar(cubo, filtros, por='categoria_de_productos')['n']
 
     # === Calcular top 5 categorías ===
-    top5 = df_filtrado['categoria_de_productos'].value_counts().head(5).reset_index()
+    conteos = conteos[conteos > 0].drop(index=[None], errors='ignore')
+    top5 = conteos.sort_values(ascending=False, kind='stable').head(5).reset_index()
     top5.columns = ['Categoría', 'Ventas']
     return top5
 
+COLUMNAS_DISPERSION = ['categoria_de_productos', 'volumen', 'costo_de_flete', 'tipo_entrega']
+
 def mostrar_dispersion_volumen_vs_flete_filtrado(df, categoria, tipo_entrega):
+    df = proyectar(df, COLUMNAS_DISPERSION)
+
     # === Filtrar solo por categoría ===
     if categoria != 'Todos':
         df = df[df['categoria_de_productos'] == categoria]
 
-    # === Asegurar formato numérico para columnas relevantes ===
-    columnas_a_convertir = ['volumen', 'costo_de_flete']
-    for columna in columnas_a_convertir:
-        df[columna] = df[columna].astype(str).str.replace(',', '.', regex=False)
-        df[columna] = pd.to_numeric(df[columna], errors='coerce')
-
-    # === Clasificar tipo de entrega (Prime, Express, Regular) ===
-    df['tiempo_total_entrega_dias'] = pd.to_numeric(df['tiempo_total_entrega_dias'], errors='coerce')
-    df['tipo_entrega'] = pd.cut(
-        df['tiempo_total_entrega_dias'],
-        bins=[-1, 3, 7, 30],
-        labels=["Prime", "Express", "Regular"]
-    )
-
     # === Filtrar por tipo_entrega (si aplica) ===
     if tipo_entrega == "Prime (0–3 días)":
         df = df[df['tipo_entrega'] == "Prime"]
@@ -246,27 +247,25 @@ def mostrar_dispersion_volumen_vs_flete_filtrado(df, categoria, tipo_entrega):
     # === Limpiar NaNs ===
     df = df.dropna(subset=['volumen', 'costo_de_flete'])
 
-    # === Crear gráfica de dispersión con color por tipo de entrega ===
-    fig = px.scatter(
+    # === Dispersión con color por tipo de entrega (SVG, WebGL o densidad según el tamaño) ===
+    fig = dispersion_por_clase(
         df,
         x='volumen',
         y='costo_de_flete',
         color='tipo_entrega',
-        color_discrete_map={
+        colores={
             'Prime': "#05d721",    
             'Express': "#dd0f98",  
             'Regular': "#1329ee"   
         },
-        labels={
+        etiquetas={
             'volumen': 'Volumen (cm³)',
             'costo_de_flete': 'Costo de Flete ($)',
             'tipo_entrega': 'Tipo de Entrega'
         },
-        opacity=0.7
+        opacidad=0.7
     )
 
-    fig.update_traces(marker=dict(size=7, line=dict(width=0.5, color='black')))
-
     fig.update_layout(
         height=250,
         width=600,
@@ -281,4 +280,56 @@ def mostrar_dispersion_volumen_vs_flete_filtrado(df, categoria, tipo_entrega):
         )
     )
 
-    return fig
\ No newline at end of file
+    return fig
+
+
+def mostrar_matriz_cohortes(motor, filas):
+    conteos = matriz_cohortes(motor, filas)
+    if conteos.empty:
+        return None
+
+    porcentajes = porcentaje_cohortes(conteos)
+    # Las celdas aún no observadas (cohortes recientes) quedan en blanco
+    porcentajes = porcentajes.where(conteos > 0)
+
+    fig = go.Figure(go.Heatmap(
+        z=porcentajes.values,
+        x=porcentajes.columns.tolist(),
+        y=porcentajes.index.tolist(),
+        customdata=conteos.values,
+        colorscale=[[0, "#eef4f7"], [0.05, "#5399df"], [1, "#020873"]],
+        zmin=0,
+        zmax=100,
+        hovertemplate="Cohorte %{y}<br>Mes +%{x}<br>%{z:.2f} %<br>Clientes: %{customdata}<extra></extra>",
+        colorbar=dict(title="%", ticksuffix=" %")
+    ))
+
+    fig.update_layout(
+        height=520,
+        width=1250,
+        margin=dict(t=10, b=60, l=90, r=30),
+        template="simple_white",
+        xaxis=dict(title="Meses desde la primera compra", dtick=1, tickfont=dict(size=11, color="black")),
+        yaxis=dict(title="Mes de primera compra", type="category", autorange="reversed", tickfont=dict(size=11, color="black")),
+        hoverlabel=dict(
+            bgcolor="white",
+            font_size=12,
+            font_family="Arial"
+        )
+    )
+
+    return fig
+
+# === Figuras renderizadas, cacheadas por versión del dataset y filtros ===
+@st.cache_data(show_spinner=False, max_entries=64)
+def html_dispersion(huella, categoria, tipo_entrega):
+    df, error = cargar_datos_version(huella)
+    fig = mostrar_dispersion_volumen_vs_flete_filtrado(df, categoria, tipo_entrega)
+    return fig.to_html(full_html=False, include_plotlyjs='cdn')
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def html_cohortes(huella, categoria, region, tipo_entrega, fecha_periodo):
+    filas_filtrado, filas_region = filtrar_filas(cargar_indice(huella), categoria, region, tipo_entrega, fecha_periodo)
+    filas = seleccionar_filas_retencion(filas_filtrado, filas_region, tipo_entrega, categoria, region)
+    fig = mostrar_matriz_cohortes(cargar_motor_retencion(huella), filas)
+    return None if fig is None else fig.to_html(full_html=False, include_plotlyjs='cdn')
@@ -1,15 +1,15 @@
 from pathlib import Path
 import streamlit as st  # type: ignore
 import matplotlib.pyplot as plt  # type: ignore
-import pandas as pd  # type: ignore
 import plotly.express as px  # type: ignore
 import plotly.graph_objects as go  # type: ignore
 import streamlit.components.v1 as components  # type: ignore
 
-from inicio import cargar_datos, aplicar_filtros, calcular_kpis
+from inicio import cargar_datos, huella_datos, cargar_indice, cargar_cubo, cargar_motor_retencion
+from inicio import filtrar_filas, calcular_kpis
+from inicio import html_dispersion, html_cohortes
 from inicio import obtener_top5_top_categorias
 from inicio import mostrar_linea_distribucion_entregas
-from inicio import mostrar_dispersion_volumen_vs_flete_filtrado  
 
 def vista_inicio():
     # === Estilos personalizados mejorados ===
@@ -101,7 +101,10 @@ def vista_inicio():
         st.warning(error)
         return
 
-    st.session_state["df_upd"] = df
+    huella = huella_datos()
+    indice = cargar_indice(huella)
+    cubo = cargar_cubo(huella)
+    motor_retencion = cargar_motor_retencion(huella)
 
     st.markdown("""
         <style>
@@ -136,16 +139,17 @@ def vista_inicio():
         region_seleccionada = st.selectbox("Región", regiones)
 
         # Crear selector de fecha en formato Mes - Año
-        df['orden_compra_timestamp_fecha'] = pd.to_datetime(df['orden_compra_timestamp_fecha'], errors='coerce')
-        fechas_unicas = df['orden_compra_timestamp_fecha'].dropna().dt.to_period('M').drop_duplicates().sort_values()
+        fechas_unicas = df['periodo'].dropna().drop_duplicates().sort_values()
         fechas_formato = ['Todos'] + fechas_unicas.astype(str).str.replace('-', ' - ', regex=False).tolist()
 
         fecha_seleccionada = st.selectbox("Fecha (Mes - Año)", fechas_formato)
         fecha_periodo = None if fecha_seleccionada == 'Todos' else fecha_seleccionada.replace(" - ", "-")  
 
-        # Aplicar filtros con fecha incluida
-        df_filtrado, df_region = aplicar_filtros(
-            df,
+        ver_cohortes = st.toggle("Ver cohortes de retención", value=False, help="Muestra la matriz de cohortes en lugar de las gráficas")
+
+        # Aplicar filtros con fecha incluida (posiciones de fila, sin copiar df)
+        filas_filtrado, filas_region = filtrar_filas(
+            indice,
             categoria_seleccionada,
             region_seleccionada,
             tipo_entrega,
@@ -154,12 +158,14 @@ def vista_inicio():
 
         # Calcular KPIs
         kpis = calcular_kpis(
-            df,
-            df_filtrado,
-            df_region,
+            cubo,
+            motor_retencion,
+            filas_filtrado,
+            filas_region,
             tipo_entrega,
             categoria_seleccionada,
-            region_seleccionada
+            region_seleccionada,
+            fecha_periodo
         )
         
     # === Mostrar título y filtros en la misma línea ===
@@ -273,14 +279,44 @@ def vista_inicio():
 </div>
 """, unsafe_allow_html=True)
     
+    # === COHORTES: misma selección de filas que la Tasa de Retención ===
+    if ver_cohortes:
+        html_matriz = html_cohortes(huella, categoria_seleccionada, region_seleccionada, tipo_entrega, fecha_periodo)
+        if html_matriz is None:
+            st.info("No hay clientes para los filtros seleccionados.")
+            return
+
+        components.html(f"""
+<div style="
+    box-shadow: 0px 12px 30px rgba(0, 0, 0, 0.4);
+    border-radius: 16px;
+    padding: 20px;
+    background-color: white;
+    width: 100%;
+    max-width: 1300px;
+    margin: auto;
+    overflow: hidden;
+">
+    <div style="
+        font-size: 18px;
+        font-weight: 600;
+        text-align: center;
+        color: black;
+        margin-bottom: 10px;
+        font-family: Arial, sans-serif;
+    ">Retención por Cohorte (% de clientes activos)</div>
+    {html_matriz}
+</div>
+""", height=595, scrolling=False)
+        return
+
     # === UNIFICADO: Las tres gráficas en una sola tarjeta ===
-    fig_linea = mostrar_linea_distribucion_entregas(kpis["dias_filtrados"], kpis["rango"])
+    fig_linea = mostrar_linea_distribucion_entregas(kpis["conteo_dias"])
     html_linea = fig_linea.to_html(full_html=False, include_plotlyjs='cdn')
 
-    fig_dispersion = mostrar_dispersion_volumen_vs_flete_filtrado(df, categoria_seleccionada, tipo_entrega)  # type: ignore
-    html_dispersion = fig_dispersion.to_html(full_html=False, include_plotlyjs='cdn')
+    html_figura_dispersion = html_dispersion(huella, categoria_seleccionada, tipo_entrega)
 
-    top5 = obtener_top5_top_categorias(df, region_seleccionada, fecha_periodo, tipo_entrega)
+    top5 = obtener_top5_top_categorias(cubo, region_seleccionada, fecha_periodo, tipo_entrega)
     top5.columns = ['Categoría', 'Ventas']
     fig_top5 = px.bar(
         top5,
@@ -360,7 +396,7 @@ def vista_inicio():
                 margin-bottom: 10px;
                 font-family: Arial, sans-serif;
             ">Volumen vs Costo de Flete</div>
-            {html_dispersion}
+            {html_figura_dispersion}
         </div>
     </div>
 
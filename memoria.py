@@ -0,0 +1,74 @@
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+# === DIAGNÓSTICO Y REDUCCIÓN DE MEMORIA DE LOS DATASETS ===
+# Las columnas de texto repetido (categoría, región, estado, tipo de pago,
+# id de cliente) pasan a 'category': se guardan una vez y cada fila queda
+# como un código entero. Los días de entrega pasan al entero más chico que
+# los contenga y los volúmenes/costos a float32.
+
+COLUMNAS_CATEGORICAS = [
+    'categoria_de_productos',
+    'categoria_nombre_producto',
+    'region',
+    'estado_del_pedido',
+    'tipo_de_pago',
+    'id_único_de_cliente',
+]
+
+# Columnas float que en realidad son enteros (días), aunque traigan nulos
+COLUMNAS_ENTERAS = [
+    'tiempo_total_entrega_dias',
+    'entrega_simulada_dias',
+]
+
+# Proporción máxima de valores únicos para convertir otras columnas de texto
+UMBRAL_CARDINALIDAD = 0.5
+
+def reporte_memoria(df):
+    memoria = df.memory_usage(deep=True, index=False)
+    reporte = pd.DataFrame({
+        'Columna': memoria.index,
+        'Tipo de Dato': [str(df[columna].dtype) for columna in memoria.index],
+        'Memoria (MB)': (memoria.values / 1024 ** 2).round(3),
+    })
+    total = memoria.sum()
+    reporte['% del Total'] = (100 * memoria.values / total).round(1) if total > 0 else 0.0
+    return reporte.sort_values('Memoria (MB)', ascending=False, ignore_index=True)
+
+def _reducir_entero(serie):
+    # Con nulos se usa el entero nullable de pandas (Int8/Int16/Int32)
+    sin_nulos = serie.dropna()
+    if sin_nulos.empty or not np.array_equal(sin_nulos, np.floor(sin_nulos)):
+        return None
+
+    for tipo, tipo_nullable in ((np.int8, 'Int8'), (np.int16, 'Int16'), (np.int32, 'Int32')):
+        limites = np.iinfo(tipo)
+        if sin_nulos.min() >= limites.min and sin_nulos.max() <= limites.max:
+            return serie.astype(tipo_nullable if serie.isna().any() else tipo)
+    return None
+
+def reducir_memoria(df, categoricas=COLUMNAS_CATEGORICAS, enteras=COLUMNAS_ENTERAS, flotantes=True):
+    # flotantes=False conserva float64: float32 redondea los valores
+    for columna in df.columns:
+        serie = df[columna]
+
+        if serie.dtype == object:
+            unicos = serie.nunique(dropna=True)
+            if columna in categoricas or (len(serie) > 0 and unicos / len(serie) <= UMBRAL_CARDINALIDAD):
+                df[columna] = serie.astype('category')
+
+        elif pd.api.types.is_bool_dtype(serie):
+            continue
+
+        elif pd.api.types.is_integer_dtype(serie) or (columna in enteras and pd.api.types.is_float_dtype(serie)):
+            entero = _reducir_entero(serie)
+            if entero is not None:
+                df[columna] = entero
+            elif pd.api.types.is_float_dtype(serie) and flotantes:
+                df[columna] = serie.astype(np.float32)
+
+        elif pd.api.types.is_float_dtype(serie) and serie.dtype != np.float32 and flotantes:
+            df[columna] = serie.astype(np.float32)
+
+    return df
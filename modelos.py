@@ -0,0 +1,48 @@
+import json
+import hashlib
+import os
+from pathlib import Path
+import joblib  # type: ignore
+import sklearn  # type: ignore
+
+# === ALMACÉN EN DISCO DE MODELOS ENTRENADOS ===
+# Cada entrenamiento se guarda en modelos/ con una clave formada por la huella
+# del dataset, los hiperparámetros y la versión de scikit-learn. Al reiniciar
+# el servidor el modelo se carga del disco en milisegundos; solo se vuelve a
+# entrenar si cambian los datos, los hiperparámetros o la librería.
+# VERSION_ARTEFACTOS también forma parte de la clave: subirla cada vez que
+# cambien las entradas del diccionario que guarda entrenamiento.py o los datos
+# con que se entrena, para que un .joblib anterior no se cargue.
+
+DIRECTORIO_MODELOS = Path("modelos")
+VERSION_ARTEFACTOS = 5
+
+def clave_modelo(nombre, huella, **parametros):
+    descripcion = {
+        "nombre": nombre,
+        "huella": huella,
+        "parametros": parametros,
+        "sklearn": sklearn.__version__,
+        "artefactos": VERSION_ARTEFACTOS,
+    }
+    resumen = hashlib.sha1(json.dumps(descripcion, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{nombre}_{resumen}"
+
+def ruta_modelo(clave):
+    return DIRECTORIO_MODELOS / f"{clave}.joblib"
+
+def cargar_modelo(clave):
+    ruta = ruta_modelo(clave)
+    if not ruta.exists():
+        return None
+    try:
+        return joblib.load(ruta)
+    except Exception:
+        return None  # Archivo dañado o incompatible: se reentrena
+
+def guardar_modelo(clave, artefactos):
+    DIRECTORIO_MODELOS.mkdir(exist_ok=True)
+    ruta = ruta_modelo(clave)
+    temporal = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+    joblib.dump(artefactos, temporal)
+    os.replace(temporal, ruta)
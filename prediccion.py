@@ -3,21 +3,78 @@ import pandas as pd # type: ignore
 from pathlib import Path
 import plotly.graph_objects as go # type: ignore
 import plotly.express as px # type: ignore
+from cargador import cargar_normalizado, tipar_columnas, clasificar_entrega, huella_archivo
+from memoria import reducir_memoria
+from indices import construir_indice, dimensiones_entrega
+from retencion import construir_motor_retencion, clientes_retenidos
+
+def normalizar_proyeccion(df):
+    # === Tipos finales y clase de entrega, una sola vez por carga ===
+    df = tipar_columnas(df, ['volumen', 'costo_de_flete', 'tiempo_total_entrega_dias', 'entrega_simulada_dias'])
+    df['tipo_entrega_simulada'] = clasificar_entrega(df['entrega_simulada_dias'])
+    return reducir_memoria(df)
+
+# === Columnas de DATASETFINALOK.xlsx que usa vista_prediccion ===
+COLUMNAS_VISTA_PREDICCION = (
+    'id_único_de_cliente',
+    'orden_compra_timestamp_fecha',
+    'categoria_de_productos',
+    'region',
+    'entrega_simulada_dias',
+    'tiempo_total_entrega_dias',
+    'volumen',
+    'costo_de_flete',
+    'retencion'
+)
+
+ARCHIVO_PROYECCION = Path("DATASETFINALOK.xlsx")
+
+def huella_proyeccion():
+    return huella_archivo(ARCHIVO_PROYECCION) if ARCHIVO_PROYECCION.exists() else None
 
-@st.cache_data(show_spinner="Cargando base de proyección...")
 def cargar_base_proyeccion():
-    archivo = Path("DATASETFINALOK.xlsx")
-    if not archivo.exists():
+    huella = huella_proyeccion()
+    if huella is None:
         return None, "Archivo baseProyeccion.xlsx no encontrado."
+    return cargar_proyeccion_version(huella)
+
+# === Cachés por versión del dataset: la huella es la clave ===
+@st.cache_resource(show_spinner="Cargando base de proyección...", max_entries=2)
+def cargar_proyeccion_version(huella):
     try:
-        df = pd.read_excel(archivo)
+        df = cargar_normalizado(ARCHIVO_PROYECCION, normalizar_proyeccion, COLUMNAS_VISTA_PREDICCION)
         return df, None
     except Exception as e:
         return None, str(e)
 
-def calcular_retencion(df):
+@st.cache_resource(show_spinner=False, max_entries=2)
+def cargar_indice_proyeccion(huella):
+    df, error = cargar_proyeccion_version(huella)
+    if error:
+        return None
+    return construir_indice({
+        'categoria_de_productos': df['categoria_de_productos'],
+        'region': df['region'],
+        **dimensiones_entrega(df['tipo_entrega_simulada'], 'tipo_entrega_simulada')
+    })
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def cargar_motor_proyeccion(huella):
+    df, error = cargar_proyeccion_version(huella)
+    if error or 'id_único_de_cliente' not in df.columns or 'orden_compra_timestamp_fecha' not in df.columns:
+        return None
+    periodos = pd.to_datetime(df['orden_compra_timestamp_fecha'], errors='coerce').dt.to_period('M')
+    return construir_motor_retencion(df['id_único_de_cliente'], periodos)
+
+def calcular_retencion(df, motor=None, filas=None):
+    # Sin la columna 'retencion' del modelo se usa la retención observada
+    # (clientes con más de un mes de compra) del motor cliente × mes
     if 'retencion' not in df.columns:
-        return 0, 0, 0.0
+        if motor is None:
+            return 0, 0, 0.0
+        retenidos, total_clientes = clientes_retenidos(motor, filas)
+        retencion = (retenidos / total_clientes) * 100 if total_clientes > 0 else 0
+        return retenidos, total_clientes, retencion
     total_clientes = len(df)
     retenidos = df['retencion'].sum()
     retencion = (retenidos / total_clientes) * 100 if total_clientes > 0 else 0
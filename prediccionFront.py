@@ -1,9 +1,12 @@
 import streamlit as st  # type: ignore
-import plotly.graph_objects as go  # type: ignore
 import plotly.express as px  # type: ignore
 import pandas as pd  # type: ignore
+import numpy as np  # type: ignore
 import streamlit.components.v1 as components  # type: ignore
-from prediccion import cargar_base_proyeccion, calcular_retencion
+from prediccion import cargar_base_proyeccion, cargar_indice_proyeccion, calcular_retencion
+from prediccion import cargar_motor_proyeccion, huella_proyeccion
+from indices import resolver_filtros, seleccionar_filas, filtro_tipo_entrega
+from graficas import dispersion_por_clase, lollipop
 
 def vista_prediccion():
     # === SWITCH para volver a vista Danu Shop desde Predicción ===
@@ -33,26 +36,25 @@ def vista_prediccion():
             "Regular (8-30 días)"
         ])
 
-    # === Aplicar filtros ===
-    df_filtrado = df_proy.copy()
+    # === Aplicar filtros (índice invertido, sin copiar df_proy) ===
+    huella = huella_proyeccion()
+    indice = cargar_indice_proyeccion(huella)
+    filtro_entrega = filtro_tipo_entrega(tipo_envio, 'tipo_entrega_simulada')
 
-    if categoria_pred != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["categoria_de_productos"] == categoria_pred]
-
-    if region_pred != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["region"] == region_pred]
+    filas = resolver_filtros(indice, {
+        "categoria_de_productos": categoria_pred,
+        "region": region_pred,
+        **filtro_entrega
+    })
+    df_filtrado = seleccionar_filas(df_proy, filas)
 
     if tipo_envio == "Prime (0-3 días)":
-        df_filtrado = df_filtrado[df_filtrado['entrega_simulada_dias'].between(0, 3)]
         rango_dias = range(0, 4)
     elif tipo_envio == "Express (4-7 días)":
-        df_filtrado = df_filtrado[df_filtrado['entrega_simulada_dias'].between(4, 7)]
         rango_dias = range(4, 8)
     elif tipo_envio == "Regular (8-30 días)":
-        df_filtrado = df_filtrado[df_filtrado['entrega_simulada_dias'].between(8, 30)]
         rango_dias = range(8, 31)
     else:
-        df_filtrado = df_filtrado[df_filtrado['entrega_simulada_dias'].between(0, 30)]
         rango_dias = range(0, 31)
 
     # === Estilos heredados de inicioFront
@@ -182,8 +184,9 @@ def vista_prediccion():
     """, unsafe_allow_html=True)
 
     # === KPIs y lógica posterior
-    retenidos_proy, total_proy, retencion_proy = calcular_retencion(df_filtrado)
-    retenidos_total, total_clientes_total, retencion_total = calcular_retencion(df_proy)
+    motor_retencion = cargar_motor_proyeccion(huella)
+    retenidos_proy, total_proy, retencion_proy = calcular_retencion(df_filtrado, motor_retencion, filas)
+    retenidos_total, total_clientes_total, retencion_total = calcular_retencion(df_proy, motor_retencion)
 
 
     retencion_actual_dict = {
@@ -242,54 +245,24 @@ def vista_prediccion():
     </div>
     """, unsafe_allow_html=True)
 
-    # === Base sin filtrar por categoría
-    df_top5 = df_proy.copy()
-
-    # Aplicar solo los filtros de región y tipo de entrega
-    if region_pred != "Todos":
-        df_top5 = df_top5[df_top5['region'] == region_pred]
-
-    if tipo_envio == "Prime (0-3 días)":
-        df_top5 = df_top5[df_top5['entrega_simulada_dias'].between(0, 3)]
-    elif tipo_envio == "Express (4-7 días)":
-        df_top5 = df_top5[df_top5['entrega_simulada_dias'].between(4, 7)]
-    elif tipo_envio == "Regular (8-30 días)":
-        df_top5 = df_top5[df_top5['entrega_simulada_dias'].between(8, 30)]
-    else:
-        df_top5 = df_top5[df_top5['entrega_simulada_dias'].between(0, 30)]
+    # === Base sin filtrar por categoría: solo región y tipo de entrega
+    filas_top5 = resolver_filtros(indice, {"region": region_pred, **filtro_entrega})
+    df_top5 = seleccionar_filas(df_proy, filas_top5)
 
     # Calcular top 5 categorías
-    top5_pred = df_top5['categoria_de_productos'].value_counts().head(5).reset_index()
+    conteo_categorias = df_top5['categoria_de_productos'].value_counts()
+    top5_pred = conteo_categorias[conteo_categorias > 0].head(5).reset_index()
     top5_pred.columns = ['Categoría', 'Pedidos']
 
     # === GRÁFICA 1: Distribución
-    dias = df_filtrado['entrega_simulada_dias'].dropna()
-    conteo_dias = dias.value_counts().sort_index()
-    conteo_dias = pd.Series(index=rango_dias, dtype=int).fillna(0).add(conteo_dias, fill_value=0).astype(int)
-
-    # === GRÁFICA TIPO LOLLIPOP: Distribución de Entregas
-    fig1 = go.Figure()
-
-    # Líneas verticales desde 0 hasta cada valor
-    for x, y in zip(conteo_dias.index, conteo_dias.values):
-        fig1.add_trace(go.Scatter(
-            x=[x, x],
-            y=[0, y],
-            mode="lines",
-            line=dict(color="#497ae9", width=2),
-            showlegend=False,
-            hoverinfo="skip"
-        ))
-
-    # Puntos arriba de cada línea
-    fig1.add_trace(go.Scatter(
-        x=conteo_dias.index,
-        y=conteo_dias.values,
-        mode="markers",
-        marker=dict(color="#7fb3ff", size=8, line=dict(width=1, color='#7fb3ff')),
-        hovertemplate="Día %{x}<br>Cantidad: %{y}<extra></extra>",
-        showlegend=False
-    ))
+    # Histograma de días con bincount: los días se redondean al entero más
+    # cercano (un valor fraccionario no se trunca) y quedan entre 0 y 30
+    dias = np.clip(np.rint(df_filtrado['entrega_simulada_dias'].dropna().to_numpy(dtype=np.float64)), 0, 30).astype(np.int64)
+    conteos = np.bincount(dias, minlength=rango_dias.stop)[rango_dias.start:rango_dias.stop]
+    conteo_dias = pd.Series(conteos, index=rango_dias)
+
+    # === GRÁFICA TIPO LOLLIPOP: Distribución de Entregas (dos trazas)
+    fig1 = lollipop(conteo_dias, color_linea="#497ae9", color_punto="#7fb3ff")
 
     # Estilo general del layout
     fig1.update_layout(
@@ -312,13 +285,6 @@ def vista_prediccion():
 
     # === Clasificar tipo de entrega (Prime, Express, Regular)
     df_plot = df_filtrado.dropna(subset=['volumen', 'costo_de_flete'])
-    df_plot['tiempo_total_entrega_dias'] = pd.to_numeric(df_plot['tiempo_total_entrega_dias'], errors='coerce')
-
-    df_plot['tipo_entrega'] = pd.cut(
-        df_plot['tiempo_total_entrega_dias'],
-        bins=[-1, 3, 7, 30],
-        labels=["Prime", "Express", "Regular"]
-    )
 
     # Aplicar lógica: solo mostrar el tipo seleccionado si no es 'Todas'
     if tipo_envio != "Todas (0-30 días)":
@@ -327,26 +293,24 @@ def vista_prediccion():
 
 
     # === Gráfico con color por tipo_entrega
-    fig2 = px.scatter(
+    fig2 = dispersion_por_clase(
         df_plot,
         x="volumen",
         y="costo_de_flete",
         color="tipo_entrega",
-        opacity=0.7,
-        labels={
+        opacidad=0.7,
+        etiquetas={
             "volumen": "Volumen (cm³)",
             "costo_de_flete": "Costo de Flete ($)",
             "tipo_entrega": "Tipo de Entrega"
         },
-        color_discrete_map={
+        colores={
             "Prime": "#19FF19",     
             "Express": "#fa73db",   
             "Regular": "#3cfdf9"    
         }
     )
 
-    fig2.update_traces(marker=dict(size=7, line=dict(width=0.5, color='black')))
-
     fig2.update_layout(
         height=330,
         width=640,
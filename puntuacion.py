@@ -0,0 +1,280 @@
+import hashlib
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from cargador import columna_numerica
+from codificacion import codificar, contar_desconocidas
+from entrenamiento import predecir
+
+# === PUNTUACIÓN POR BLOQUES DE ARCHIVOS SUBIDOS ===
+# El archivo se lee por bloques (read_csv con chunksize u openpyxl en modo
+# read_only) y cada bloque se codifica, escala, predice y se agrega al archivo
+# de resultados en disco (CSV o Parquet). En memoria solo vive un bloque a la
+# vez, sin importar el tamaño; la tabla paginada lee las filas desde el archivo.
+
+COLUMNAS_SUBIDA = ['volumen', 'region', 'categoria_de_productos']
+ETIQUETAS_PREDICCION = {0: 'Prime', 1: 'Express', 2: 'Regular'}
+FILAS_POR_BLOQUE = 50_000
+DIRECTORIO_RESULTADOS = Path(tempfile.gettempdir()) / "danu_predicciones"
+
+def _bloques_csv(archivo, filas_por_bloque):
+    total = getattr(archivo, "size", None) or 0
+    for bloque in pd.read_csv(archivo, chunksize=filas_por_bloque):
+        avance = archivo.tell() / total if total else 0.0
+        yield bloque, min(avance, 1.0)
+
+def _bloques_excel(archivo, filas_por_bloque):
+    import openpyxl  # type: ignore
+
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        hoja = libro.active
+        total = hoja.max_row or 0
+        filas = hoja.iter_rows(values_only=True)
+        encabezado = [str(celda) for celda in next(filas, ())]
+
+        lote, leidas = [], 1
+        for fila in filas:
+            lote.append(fila)
+            leidas += 1
+            if len(lote) == filas_por_bloque:
+                yield pd.DataFrame(lote, columns=encabezado), (leidas / total if total else 0.0)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=encabezado), 1.0
+    finally:
+        libro.close()
+
+def leer_por_bloques(archivo, nombre, filas_por_bloque=FILAS_POR_BLOQUE):
+    # El mismo archivo subido puede puntuarse otra vez en un rerun posterior
+    archivo.seek(0)
+    if str(nombre).lower().endswith(".csv"):
+        return _bloques_csv(archivo, filas_por_bloque)
+    return _bloques_excel(archivo, filas_por_bloque)
+
+# === PREDICCIÓN SOLO DE TUPLAS ÚNICAS ===
+# Muchos pedidos repiten (volumen, region, categoria_de_productos). Cada bloque
+# se agrupa por esa tupla, solo las tuplas nuevas pasan por el codificador, el
+# escalador y el modelo, y la etiqueta se copia a todas las filas del grupo.
+# El memo guarda tupla -> etiqueta por versión del modelo, así que un archivo
+# parecido a uno ya puntuado solo predice las tuplas que no se habían visto.
+
+MAX_TUPLAS_MEMO = 500_000
+
+def puntuar_bloque(modelo, bloque, estimador="knn", memo=None):
+    claves = bloque[COLUMNAS_SUBIDA]
+    grupos = claves.groupby(COLUMNAS_SUBIDA, dropna=False, sort=False).ngroup().to_numpy()
+    _, primeras = np.unique(grupos, return_index=True)
+    unicas = claves.iloc[primeras]
+    tuplas = list(unicas.itertuples(index=False, name=None))
+
+    etiquetas = np.empty(len(tuplas), dtype=object)
+    faltan = []
+    for posicion, tupla in enumerate(tuplas):
+        etiqueta = memo["tuplas"].get(tupla) if memo is not None else None
+        if etiqueta is None:
+            faltan.append(posicion)
+        else:
+            etiquetas[posicion] = etiqueta
+
+    if faltan:
+        nuevas = unicas.iloc[faltan].rename(columns={'categoria_de_productos': 'categoria_nombre_producto'})
+        # Codificador guardado con el modelo: índices fijos, sin get_dummies
+        X, _ = codificar(modelo["codificador"], nuevas)
+        predicciones = predecir(modelo, modelo["scaler"].transform(X), estimador)
+        etiquetas[faltan] = [ETIQUETAS_PREDICCION[p] for p in predicciones]
+        if memo is not None:
+            recordar(memo, [tuplas[i] for i in faltan], etiquetas[faltan])
+
+    # Los valores no vistos se cuentan por fila, no por tupla
+    desconocidas = contar_desconocidas(
+        modelo["codificador"], claves.rename(columns={'categoria_de_productos': 'categoria_nombre_producto'})
+    )
+    bloque = bloque.assign(**{'Predicción': etiquetas[grupos]})
+    return bloque, desconocidas, len(faltan)
+
+def crear_memo():
+    return {"tuplas": {}, "candado": threading.Lock()}
+
+def recordar(memo, tuplas, etiquetas):
+    with memo["candado"]:
+        memo["tuplas"].update(zip(tuplas, etiquetas))
+        exceso = len(memo["tuplas"]) - MAX_TUPLAS_MEMO
+        if exceso > 0:
+            # Se descartan las tuplas más antiguas (orden de inserción)
+            for tupla in list(islice(memo["tuplas"], exceso)):
+                del memo["tuplas"][tupla]
+
+# === TABLA DE CONTEOS PARA LA GRÁFICA ===
+# región × categoría × clase predicha, acumulada bloque a bloque. La gráfica de
+# distribución se dibuja desde aquí: cambiar de región filtra unas decenas de
+# filas y al navegador solo viajan los conteos.
+
+COLUMNAS_CONTEO = ['region', 'categoria_de_productos', 'Predicción']
+
+def contar_predicciones(bloque):
+    claves = bloque[COLUMNAS_CONTEO].astype({'region': object, 'categoria_de_productos': object})
+    # Las filas sin región cuentan para "Todas"; sin categoría no se grafican
+    return claves.groupby(COLUMNAS_CONTEO, dropna=False).size()
+
+def sumar_conteos(conteos):
+    if not conteos:
+        return pd.DataFrame(columns=COLUMNAS_CONTEO + ['Cantidad'])
+    total = pd.concat(conteos).groupby(level=list(range(len(COLUMNAS_CONTEO))), dropna=False).sum()
+    total.index.names = COLUMNAS_CONTEO
+    return total.rename('Cantidad').reset_index()
+
+def conteos_por_categoria(conteos, region='Todas'):
+    if region != 'Todas':
+        conteos = conteos[conteos['region'] == region]
+    conteos = conteos.dropna(subset=['categoria_de_productos'])
+    return conteos.groupby(['categoria_de_productos', 'Predicción'], as_index=False)['Cantidad'].sum()
+
+# === ESCRITURA INCREMENTAL DEL RESULTADO ===
+
+# Tipo fijo por columna conocida; cualquier otra columna del archivo subido se
+# escribe como texto. No se infiere del primer bloque: un bloque posterior
+# puede traer texto o solo nulos en una columna que antes parecía numérica.
+TIPOS_SALIDA = {
+    'volumen': 'float64',
+    'region': 'string',
+    'categoria_de_productos': 'string',
+    'Predicción': 'string',
+}
+
+def _tipos_salida(bloque):
+    return {columna: TIPOS_SALIDA.get(columna, 'string') for columna in bloque.columns}
+
+def _convertir_salida(bloque, tipos):
+    return bloque.assign(**{
+        columna: columna_numerica(bloque[columna]).astype('float64') if tipo == 'float64'
+        else bloque[columna].astype('string')
+        for columna, tipo in tipos.items()
+    })
+
+def _escribir_bloque(estado, bloque):
+    if estado["tipos"] is None:
+        estado["tipos"] = _tipos_salida(bloque)
+    bloque = _convertir_salida(bloque, estado["tipos"])
+    if estado["formato"] == "csv":
+        bloque.to_csv(estado["ruta"], mode="a", header=estado["filas"] == 0, index=False)
+        return
+
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+    if estado["escritor"] is None:
+        estado["escritor"] = pq.ParquetWriter(estado["ruta"], tabla.schema)
+    estado["escritor"].write_table(tabla.cast(estado["escritor"].schema))
+
+def puntuar_archivo(modelo, archivo, nombre, formato="csv", estimador="knn", reportar=None,
+                    filas_por_bloque=FILAS_POR_BLOQUE, memo=None):
+    # reportar(avance, filas) se llama después de cada bloque
+    reportar = reportar or (lambda avance, filas: None)
+    DIRECTORIO_RESULTADOS.mkdir(parents=True, exist_ok=True)
+    ruta = DIRECTORIO_RESULTADOS / f"predicciones_{uuid.uuid4().hex[:12]}.{formato}"
+
+    estado = {"ruta": ruta, "formato": formato, "filas": 0, "predichas": 0, "escritor": None, "tipos": None}
+    desconocidas, conteos = {}, []
+    inicio = time.perf_counter()
+    try:
+        for bloque, avance in leer_por_bloques(archivo, nombre, filas_por_bloque):
+            if estado["filas"] == 0 and not set(COLUMNAS_SUBIDA).issubset(bloque.columns):
+                raise ValueError("El archivo debe contener las columnas: 'volumen', 'region' y 'categoria_de_productos'")
+
+            bloque, nuevas, predichas = puntuar_bloque(modelo, bloque, estimador, memo)
+            estado["predichas"] += predichas
+            for columna, conteo in nuevas.items():
+                desconocidas[columna] = conteo.add(desconocidas.get(columna, 0), fill_value=0)
+
+            conteos.append(contar_predicciones(bloque))
+
+            _escribir_bloque(estado, bloque)
+            estado["filas"] += len(bloque)
+            reportar(avance, estado["filas"])
+    except Exception:
+        if estado["escritor"] is not None:
+            estado["escritor"].close()
+        ruta.unlink(missing_ok=True)
+        raise
+
+    if estado["escritor"] is not None:
+        estado["escritor"].close()
+
+    return {
+        "ruta": ruta,
+        "formato": formato,
+        "tipos": estado["tipos"],
+        "filas": estado["filas"],
+        "predichas": estado["predichas"],
+        "desconocidas": desconocidas,
+        "conteos": sumar_conteos(conteos),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+def leer_resultado(resultado, columnas=None):
+    if resultado["formato"] == "csv":
+        return pd.read_csv(resultado["ruta"], usecols=columnas)
+    return pd.read_parquet(resultado["ruta"], columns=columnas)
+
+def borrar_resultado(resultado):
+    if resultado is not None:
+        Path(resultado["ruta"]).unlink(missing_ok=True)
+
+# === CACHÉ DE RESULTADOS POR CONTENIDO ===
+# Clave: hash del contenido del archivo subido + versión del modelo (clave del
+# almacén y estimador) + formato. Volver a subir el mismo archivo, desde
+# cualquier sesión, devuelve el resultado ya escrito en disco. Se conservan
+# los MAX_RESULTADOS usados más recientemente; al expulsar uno se borra su archivo.
+# Los memos de tuplas (hasta MAX_TUPLAS_MEMO cada uno) se conservan solo para
+# las MAX_MEMOS versiones de modelo usadas más recientemente.
+
+MAX_RESULTADOS = 16
+MAX_MEMOS = 4
+
+def huella_contenido(archivo, tamano_lectura=1024 * 1024):
+    resumen = hashlib.sha1()
+    archivo.seek(0)
+    for parte in iter(lambda: archivo.read(tamano_lectura), b""):
+        resumen.update(parte)
+    archivo.seek(0)
+    return resumen.hexdigest()
+
+def crear_cache_resultados(max_resultados=MAX_RESULTADOS, max_memos=MAX_MEMOS):
+    return {"resultados": OrderedDict(), "memos": OrderedDict(), "max": max_resultados,
+            "max_memos": max_memos, "candado": threading.Lock()}
+
+def memo_modelo(cache, version):
+    with cache["candado"]:
+        if version not in cache["memos"]:
+            cache["memos"][version] = crear_memo()
+        cache["memos"].move_to_end(version)
+        while len(cache["memos"]) > cache["max_memos"]:
+            cache["memos"].popitem(last=False)
+        return cache["memos"][version]
+
+def buscar_resultado(cache, clave):
+    with cache["candado"]:
+        resultado = cache["resultados"].get(clave)
+        if resultado is None:
+            return None
+        if not Path(resultado["ruta"]).exists():
+            del cache["resultados"][clave]
+            return None
+        cache["resultados"].move_to_end(clave)
+        return resultado
+
+def guardar_resultado(cache, clave, resultado):
+    with cache["candado"]:
+        cache["resultados"][clave] = resultado
+        cache["resultados"].move_to_end(clave)
+        while len(cache["resultados"]) > cache["max"]:
+            _, expulsado = cache["resultados"].popitem(last=False)
+            borrar_resultado(expulsado)
@@ -0,0 +1,114 @@
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+# === MOTOR DE RETENCIÓN CLIENTE × MES ===
+# Cada pedido se codifica una sola vez como (cliente, palabra, bit), donde el
+# bit marca su mes dentro de una palabra de 64 meses. Para cualquier subconjunto
+# de filas se arma con OR la máscara de meses activos de cada cliente y un
+# cliente es retenido si su máscara tiene más de un bit encendido (popcount > 1).
+# Reemplaza al groupby('id_único_de_cliente')['periodo'].nunique() por rerun.
+
+BITS_POR_PALABRA = 64
+
+def construir_motor_retencion(clientes, periodos):
+    cod_cliente, unicos_cliente = pd.factorize(clientes)
+    cod_periodo, unicos_periodo = pd.factorize(periodos, sort=True)
+    n_palabras = max(1, -(-len(unicos_periodo) // BITS_POR_PALABRA))
+
+    con_periodo = cod_periodo >= 0
+    palabra = np.where(con_periodo, cod_periodo // BITS_POR_PALABRA, 0)
+    bit = np.where(
+        con_periodo,
+        np.left_shift(np.uint64(1), (cod_periodo % BITS_POR_PALABRA).astype(np.uint64)),
+        np.uint64(0)
+    ).astype(np.uint64)
+
+    # Número de mes absoluto de cada periodo, para medir meses transcurridos
+    # aunque haya meses sin pedidos entre dos periodos
+    if isinstance(unicos_periodo, pd.PeriodIndex):
+        mes_absoluto = unicos_periodo.asi8
+    else:
+        mes_absoluto = np.arange(len(unicos_periodo))
+
+    return {
+        "cliente": cod_cliente.astype(np.int32),
+        "periodo": cod_periodo.astype(np.int32),
+        "celda": (cod_cliente.astype(np.int64) * n_palabras + palabra),
+        "bit": bit,
+        "n_clientes": len(unicos_cliente),
+        "n_palabras": n_palabras,
+        "periodos": unicos_periodo,
+        "mes_absoluto": np.asarray(mes_absoluto, dtype=np.int64),
+    }
+
+def _popcount(valores):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(valores)
+    # SWAR para numpy < 2.0
+    v = valores - ((valores >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    v = (v & np.uint64(0x3333333333333333)) + ((v >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    v = (v + (v >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (v * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+def mascaras_clientes(motor, filas=None):
+    # Máscara de meses activos por cliente (n_clientes × n_palabras) y la
+    # marca de qué clientes aparecen en el subconjunto
+    cliente = motor["cliente"] if filas is None else motor["cliente"][filas]
+    celda = motor["celda"] if filas is None else motor["celda"][filas]
+    bit = motor["bit"] if filas is None else motor["bit"][filas]
+
+    validas = cliente >= 0
+    mascaras = np.zeros(motor["n_clientes"] * motor["n_palabras"], dtype=np.uint64)
+    np.bitwise_or.at(mascaras, celda[validas], bit[validas])
+
+    presentes = np.bincount(cliente[validas], minlength=motor["n_clientes"]) > 0
+    return mascaras.reshape(motor["n_clientes"], motor["n_palabras"]), presentes
+
+def clientes_retenidos(motor, filas=None):
+    mascaras, presentes = mascaras_clientes(motor, filas)
+    meses_activos = _popcount(mascaras).sum(axis=1)
+    return int((meses_activos > 1).sum()), int(presentes.sum())
+
+def tasa_retencion(motor, filas=None):
+    retenidos, totales = clientes_retenidos(motor, filas)
+    return (retenidos / totales) * 100 if totales > 0 else 0
+
+# === MATRIZ DE COHORTES ===
+# Filas: mes de primera compra (dentro del subconjunto). Columnas: meses desde
+# esa primera compra. Valor: clientes distintos activos en ese mes. Todo con
+# códigos enteros y bincount, sin bucles por cliente ni pivot_table.
+
+def matriz_cohortes(motor, filas=None):
+    cliente = motor["cliente"] if filas is None else motor["cliente"][filas]
+    periodo = motor["periodo"] if filas is None else motor["periodo"][filas]
+    validas = (cliente >= 0) & (periodo >= 0)
+    cliente, periodo = cliente[validas], periodo[validas]
+
+    n_periodos = len(motor["periodos"])
+    if len(cliente) == 0:
+        return pd.DataFrame()
+
+    # Un par (cliente, periodo) por cliente activo en el mes
+    pares = np.unique(cliente.astype(np.int64) * n_periodos + periodo)
+    cliente, periodo = pares // n_periodos, pares % n_periodos
+
+    primera = np.full(motor["n_clientes"], n_periodos, dtype=np.int64)
+    np.minimum.at(primera, cliente, periodo)
+    cohorte = primera[cliente]
+
+    meses = motor["mes_absoluto"]
+    desfase = meses[periodo] - meses[cohorte]
+    n_desfases = int(desfase.max()) + 1
+
+    conteos = np.bincount(cohorte * n_desfases + desfase, minlength=n_periodos * n_desfases)
+    conteos = conteos.reshape(n_periodos, n_desfases)
+
+    con_clientes = conteos[:, 0] > 0
+    return pd.DataFrame(
+        conteos[con_clientes],
+        index=pd.Index(np.asarray(motor["periodos"].astype(str))[con_clientes], name="Cohorte"),
+        columns=pd.RangeIndex(n_desfases, name="Meses desde la primera compra")
+    )
+
+def porcentaje_cohortes(conteos):
+    return conteos.div(conteos[0], axis=0) * 100
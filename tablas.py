@@ -0,0 +1,115 @@
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+import streamlit as st  # type: ignore
+
+# === TABLAS PAGINADAS DEL LADO DEL SERVIDOR ===
+# El navegador recibe solo la página visible. El filtro y el orden se
+# resuelven en el servidor leyendo únicamente las columnas involucradas: el
+# resultado es el arreglo de posiciones de fila en orden, y de él se toman las
+# filas de la página. La fuente puede ser un archivo de resultados (CSV o
+# Parquet, vía pyarrow.dataset) o un DataFrame que ya está en memoria.
+
+FILAS_POR_PAGINA = [25, 50, 100, 250]
+
+# 'id' identifica el contenido de la fuente para la caché de posiciones: la
+# ruta del archivo (única por resultado) o una versión que da quien llama
+
+def fuente_archivo(ruta, formato, total, tipos=None):
+    # tipos: {columna: "float64"|"string"} con que se escribió el archivo
+    return {"tipo": "archivo", "id": str(ruta), "ruta": str(ruta), "formato": formato, "total": total, "tipos": tipos}
+
+def fuente_dataframe(df, version):
+    return {"tipo": "dataframe", "id": str(version), "df": df, "total": len(df)}
+
+def _dataset(fuente):
+    import pyarrow as pa  # type: ignore
+    import pyarrow.csv as csv  # type: ignore
+    import pyarrow.dataset as ds  # type: ignore
+
+    if fuente["formato"] != "csv":
+        return ds.dataset(fuente["ruta"], format="parquet")
+    # En CSV Arrow infiere el tipo con el primer bloque; se fija el de la escritura.
+    # Las celdas vacías de texto se leen como nulos (no como ""), para que el
+    # orden las deje al final y el filtro no las tome como valor
+    tipos = {
+        columna: pa.float64() if tipo == "float64" else pa.string()
+        for columna, tipo in (fuente["tipos"] or {}).items()
+    }
+    formato = ds.CsvFileFormat(convert_options=csv.ConvertOptions(column_types=tipos, strings_can_be_null=True))
+    return ds.dataset(fuente["ruta"], format=formato)
+
+def columnas_fuente(fuente):
+    if fuente["tipo"] == "dataframe":
+        return [str(columna) for columna in fuente["df"].columns]
+    return list(_dataset(fuente).schema.names)
+
+def _leer_columna(fuente, columna):
+    if fuente["tipo"] == "dataframe":
+        return pd.Series(fuente["df"][columna].to_numpy(), name=columna)
+    return _dataset(fuente).to_table(columns=[columna]).column(0).to_pandas()
+
+def posiciones_ordenadas(fuente, total, orden=None, ascendente=True, columna_filtro=None, texto=""):
+    # Posiciones de las filas que pasan el filtro, en el orden pedido
+    posiciones = np.arange(total)
+
+    if columna_filtro and texto:
+        valores = _leer_columna(fuente, columna_filtro)
+        coincide = valores.astype(str).str.contains(texto, case=False, regex=False) & valores.notna()
+        posiciones = posiciones[coincide.to_numpy()]
+
+    if orden:
+        valores = _leer_columna(fuente, orden).iloc[posiciones]
+        # Orden estable; los nulos siempre al final
+        orden_local = np.argsort(
+            valores.rank(method="first", ascending=ascendente, na_option="bottom").to_numpy(), kind="stable"
+        )
+        posiciones = posiciones[orden_local]
+
+    return posiciones
+
+def leer_filas(fuente, posiciones):
+    if fuente["tipo"] == "dataframe":
+        return fuente["df"].iloc[posiciones]
+    tabla = _dataset(fuente).take(np.asarray(posiciones, dtype=np.int64))
+    return tabla.to_pandas().set_axis(posiciones)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _posiciones_cacheadas(_fuente, id_fuente, total, orden, ascendente, columna_filtro, texto):
+    # La fuente va con guion bajo para que Streamlit no hashee el DataFrame;
+    # la caché se distingue por id_fuente
+    return posiciones_ordenadas(_fuente, total, orden, ascendente, columna_filtro, texto)
+
+def mostrar_tabla_paginada(clave, fuente):
+    total = fuente["total"]
+    columnas = columnas_fuente(fuente)
+
+    col_filtro, col_texto, col_orden, col_sentido = st.columns([2, 3, 2, 1])
+    with col_filtro:
+        columna_filtro = st.selectbox("Filtrar columna", [None] + columnas,
+                                      format_func=lambda c: "—" if c is None else c, key=f"{clave}_filtro")
+    with col_texto:
+        texto = st.text_input("Contiene", key=f"{clave}_texto", disabled=columna_filtro is None)
+    with col_orden:
+        orden = st.selectbox("Ordenar por", [None] + columnas,
+                             format_func=lambda c: "—" if c is None else c, key=f"{clave}_orden")
+    with col_sentido:
+        ascendente = st.toggle("Asc.", value=True, key=f"{clave}_ascendente", disabled=orden is None)
+
+    posiciones = _posiciones_cacheadas(
+        fuente, fuente["id"], total, orden, ascendente, columna_filtro if texto else None, texto
+    )
+
+    col_tamano, col_pagina, col_info = st.columns([1, 1, 3])
+    with col_tamano:
+        por_pagina = st.selectbox("Filas por página", FILAS_POR_PAGINA, key=f"{clave}_por_pagina")
+    paginas = max(1, -(-len(posiciones) // por_pagina))
+    # Un filtro nuevo puede dejar la página guardada fuera de rango
+    if st.session_state.get(f"{clave}_pagina", 1) > paginas:
+        st.session_state[f"{clave}_pagina"] = paginas
+    with col_pagina:
+        pagina = int(st.number_input("Página", min_value=1, max_value=paginas, step=1, key=f"{clave}_pagina"))
+    with col_info:
+        st.caption(f"{len(posiciones):,} de {total:,} filas · página {pagina} de {paginas}")
+
+    visibles = posiciones[(pagina - 1) * por_pagina: pagina * por_pagina]
+    st.dataframe(leer_filas(fuente, visibles), use_container_width=True)